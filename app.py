@@ -1,16 +1,50 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+from flask import (Flask, render_template, request, redirect, url_for, flash, jsonify, abort, send_from_directory, g,
+                   has_request_context, stream_with_context)
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, func
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from werkzeug.http import is_resource_modified
+import click
+import hashlib
+import hmac
+import mimetypes
 import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
 from datetime import datetime, date, timedelta
 
+import assets
+import archive
+import backup
+import dependencies
+import ical
+import profiler
+
 
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
-DB_PATH = os.path.join(BASE_DIR, 'tracker.db')
+# Both can be pointed elsewhere, e.g. at a scratch copy for load testing
+DB_PATH = os.environ.get('TRACKER_DB_PATH') or os.path.join(BASE_DIR, 'tracker.db')
+UPLOAD_DIR = os.environ.get('TRACKER_UPLOAD_DIR') or os.path.join(BASE_DIR, 'uploads')
+BACKUP_DIR = os.path.join(BASE_DIR, 'backups')
+PROFILE_DIR = os.path.join(BASE_DIR, 'profiles')
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+# Bundles have content-hashed names, so they never change under a URL
+ASSET_MAX_AGE = 365 * 24 * 3600
 
 app = Flask(__name__)
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + DB_PATH
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SECRET_KEY'] = 'change_this_secret'
+# Admin-only routes (backups, ...) are disabled unless this token is set
+app.config['ADMIN_TOKEN'] = os.environ.get('TRACKER_ADMIN_TOKEN')
+# Per-request profiling: admins add `X-Profile: 1` or `?_profile=1` once this is on
+app.config['PROFILING_ENABLED'] = os.environ.get('TRACKER_PROFILING') == '1'
+app.config['PROFILING_INTERVAL'] = profiler.DEFAULT_INTERVAL
 
 db = SQLAlchemy(app)
 
@@ -41,6 +75,61 @@ def add_weekdays(d, days):
     
     return adjust_to_weekday(result)
 
+def shift_weekdays(d, days):
+    """Move a date by a signed number of business days in constant time.
+    Weekend dates count from the following Monday."""
+    d = adjust_to_weekday(d)
+    weeks, rest = divmod(days, 5)  # floors, so rest is always 0..4
+    d += timedelta(weeks=weeks)
+    if d.weekday() + rest >= 5:  # crosses a weekend
+        rest += 2
+    return d + timedelta(days=rest)
+
+def weekdays_between(start, end):
+    """Signed number of business days from start to end, so that
+    shift_weekdays(start, n) == end for weekday dates"""
+    start, end = adjust_to_weekday(start), adjust_to_weekday(end)
+    if end < start:
+        return -weekdays_between(end, start)
+    weeks, rest = divmod((end - start).days, 7)
+    count = weeks * 5
+    for i in range(1, rest + 1):
+        if (start.weekday() + i) % 7 < 5:
+            count += 1
+    return count
+
+
+@event.listens_for(Engine, 'connect')
+def register_sqlite_functions(dbapi_connection, connection_record):
+    """Expose date helpers to SQL so set-based statements can use them"""
+    def sql_shift_weekdays(value, days):
+        if value is None:
+            return None
+        return shift_weekdays(date.fromisoformat(value), days).isoformat()
+
+    dbapi_connection.create_function('shift_weekdays', 2, sql_shift_weekdays, deterministic=True)
+
+
+# Static bundles (see assets.py)
+_asset_manifest = None
+_asset_lock = threading.Lock()
+
+
+def asset_manifest():
+    """Bundle name -> hashed filename, building the bundles if needed"""
+    global _asset_manifest
+    # in debug mode pick up edits to the sources on the next page load
+    if _asset_manifest is None or app.debug:
+        # concurrent first requests wait for one build instead of each doing it
+        with _asset_lock:
+            _asset_manifest = assets.load_manifest(STATIC_DIR) or assets.build(STATIC_DIR)
+    return _asset_manifest
+
+
+@app.template_global()
+def asset_url(name):
+    return url_for('asset', filename=asset_manifest()[name])
+
 
 # Models
 # Project model
@@ -50,6 +139,10 @@ class Project(db.Model):
     description = db.Column(db.Text)
     stage = db.Column(db.String(20), default='Planning')   # ← NEW
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Bumped on every change to the project or anything in it (see
+    # bump_project_versions); used for ETags and cache keys
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     tasks = db.relationship('Task', backref='project', cascade='all, delete-orphan', lazy=True)
     todos = db.relationship('Todo', backref='project', cascade='all, delete-orphan', lazy=True)
@@ -62,6 +155,7 @@ class Task(db.Model):
     vendor = db.Column(db.String(120))          # ← NEW COLUMN
     start_date = db.Column(db.Date)
     end_date = db.Column(db.Date)
+    # Primary predecessor, shown first; all of them live in TaskDependency
     dependency_id = db.Column(db.Integer, db.ForeignKey('task.id'), nullable=True)
     status = db.Column(db.String(20), default='Not Started')
     notes = db.Column(db.Text)
@@ -90,41 +184,42 @@ class Task(db.Model):
         
         return business_days
     
-    def adjust_dates_for_dependency(self, dependency_end_date_change):
-        """Adjust start and end dates when dependency changes"""
-        if not self.dependency_id:
-            return
-        
-        # Get the current dependency task
-        dependency = Task.query.get(self.dependency_id)
-        if not dependency or not dependency.end_date:
-            return
-        
-        # Instead of moving by the same number of days, 
-        # set start date to the next day after dependency ends
-        if dependency.end_date:
-            new_start = dependency.end_date + timedelta(days=1)
-            self.start_date = adjust_to_weekday(new_start)
-        
-        # Adjust end date to maintain the same duration
-        if self.start_date and self.end_date:
-            duration = self.get_duration_days()
-            new_end = self.start_date
-            business_days_added = 0
-            
-            # Add business days to reach the required duration
-            while business_days_added < duration:
-                new_end += timedelta(days=1)
-                if new_end.weekday() < 5:  # Monday to Friday
-                    business_days_added += 1
-                # If we hit a weekend, continue to the next day without counting it
-            
-            # Ensure the final date is not on a weekend
-            self.end_date = adjust_to_weekday(new_end)
-        
-        # Recursively adjust dependent tasks - this will cascade through the entire chain
-        for dependent_task in self.dependent_tasks:
-            dependent_task.adjust_dates_for_dependency(0)
+    def adjust_dates_for_dependency(self, graph, tasks_by_id, only_later=False):
+        """Start the business day after the latest of this task's
+        predecessors ends (plus that link's lag), keeping the duration.
+        With only_later, a task that already starts late enough is left
+        alone. Returns True if the dates moved."""
+        new_start = None
+        for predecessor_id, lag in graph.predecessors(self.id).items():
+            predecessor = tasks_by_id.get(predecessor_id)
+            if predecessor and predecessor.end_date:
+                candidate = add_weekdays(predecessor.end_date, 1 + lag)
+                if new_start is None or candidate > new_start:
+                    new_start = candidate
+        if new_start is None or new_start == self.start_date:
+            return False
+        if only_later and self.start_date and new_start < self.start_date:
+            return False
+
+        # Measure the duration before moving the start
+        duration = self.get_duration_days()
+        self.start_date = new_start
+        if self.end_date:
+            self.end_date = shift_weekdays(new_start, max(duration, 1) - 1)
+        return True
+
+
+class TaskDependency(db.Model):
+    """Dependency edge: task_id can't start until predecessor_id has ended
+    and lag_days more business days have passed"""
+    task_id = db.Column(db.Integer, db.ForeignKey('task.id'), primary_key=True)
+    predecessor_id = db.Column(db.Integer, db.ForeignKey('task.id'), primary_key=True, index=True)
+    lag_days = db.Column(db.Integer, nullable=False, default=0)
+
+    task = db.relationship('Task', foreign_keys=[task_id],
+                           backref=db.backref('predecessor_links', cascade='all, delete-orphan'))
+    predecessor = db.relationship('Task', foreign_keys=[predecessor_id],
+                                  backref=db.backref('successor_links', cascade='all, delete-orphan'))
 
 
 class Todo(db.Model):                                   # ← NEW TABLE
@@ -172,6 +267,272 @@ Task.materials = db.relationship('Material', back_populates='task', cascade='all
 Project.materials = db.relationship('Material', back_populates='project', cascade='all, delete-orphan')
 
 
+class ArchivedProject(db.Model):
+    """A finished project moved out of the live tables. Everything it
+    contained is in `payload` (see archive.py); the other columns are what
+    the archive page lists and searches."""
+    id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.Integer, nullable=False, index=True)   # id it had when archived
+    name = db.Column(db.String(120), nullable=False)
+    description = db.Column(db.Text)
+    stage = db.Column(db.String(20))
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+    task_count = db.Column(db.Integer, nullable=False, default=0)
+    search_text = db.Column(db.Text, nullable=False, default='')
+    payload = db.deferred(db.Column(db.LargeBinary, nullable=False))
+
+
+def _owning_project_id(obj):
+    """Project id a changed row belongs to, or None if it can't tell yet"""
+    if isinstance(obj, Project):
+        return obj.id
+    if isinstance(obj, (Task, Todo, Material)):
+        return obj.project_id or (obj.project.id if obj.project else None)
+    if isinstance(obj, MaterialVariant):
+        material = obj.material or (Material.query.get(obj.material_id) if obj.material_id else None)
+        return _owning_project_id(material) if material else None
+    if isinstance(obj, (TaskAttachment, TaskDependency)):
+        task = obj.task or (Task.query.get(obj.task_id) if obj.task_id else None)
+        return _owning_project_id(task) if task else None
+    return None
+
+
+def touch_projects(project_ids, session=None):
+    """Bump version/updated_at for the given projects. Needed after bulk
+    `query.update()` calls, which bypass the flush hook below."""
+    project_ids = {pid for pid in project_ids if pid}
+    if not project_ids:
+        return
+    session = session or db.session
+    session.info.setdefault('touched_projects', set()).update(project_ids)
+    table = Project.__table__
+    session.execute(
+        table.update()
+        .where(table.c.id.in_(project_ids))
+        .values(version=table.c.version + 1, updated_at=datetime.utcnow())
+    )
+
+
+def project_revision(project_id, created_at, version):
+    """Names one state of one project, for ETags and cache keys. SQLite
+    hands a deleted project's id to the next new project and versions
+    start over at 1, so created_at is needed to tell the two apart."""
+    born = int(created_at.timestamp() * 1000000) if created_at else 0
+    return f'{project_id}-{born:x}-{version}'
+
+
+@event.listens_for(Session, 'before_flush')
+def bump_project_versions(session, flush_context, instances):
+    project_ids = set()
+    with session.no_autoflush:
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            if obj in session.dirty and not session.is_modified(obj):
+                continue
+            project_ids.add(_owning_project_id(obj))
+    touch_projects(project_ids, session)
+
+
+# --- task dependencies ---------------------------------------------
+# project id -> (project revision, DependencyGraph). Every write to a project
+# bumps its version, so a cached graph is never used after a change. Graphs
+# of projects the current transaction has touched aren't cached at all, as
+# the transaction may still roll back.
+_graph_cache = {}
+_graph_cache_lock = threading.Lock()
+
+
+@event.listens_for(Session, 'after_commit')
+def forget_dependency_graphs(session):
+    with _graph_cache_lock:
+        for project_id in session.info.get('touched_projects', ()):
+            _graph_cache.pop(project_id, None)
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def reset_touched_projects(session, transaction):
+    if transaction.parent is None:
+        session.info.pop('touched_projects', None)
+
+
+def dependency_graph(project_id):
+    """The project's dependency edges as a DependencyGraph, loaded with one
+    query and cached until the project's version changes"""
+    proj = db.session.query(Project.version, Project.created_at).filter(Project.id == project_id).first()
+    revision = project_revision(project_id, proj.created_at, proj.version) if proj else None
+    with _graph_cache_lock:
+        cached = _graph_cache.get(project_id)
+    if cached and cached[0] == revision:
+        return cached[1]
+
+    rows = (db.session.query(TaskDependency.task_id, TaskDependency.predecessor_id, TaskDependency.lag_days)
+            .join(Task, Task.id == TaskDependency.task_id)
+            .filter(Task.project_id == project_id))
+    graph = dependencies.DependencyGraph(rows)
+    if project_id not in db.session.info.get('touched_projects', ()):
+        with _graph_cache_lock:
+            _graph_cache[project_id] = (revision, graph)
+    return graph
+
+
+def earliest_start(task, graph=None):
+    """First business day the task may start given all its predecessors,
+    or None if nothing constrains it"""
+    graph = graph or dependency_graph(task.project_id)
+    links = graph.predecessors(task.id)
+    if not links:
+        return None
+    ends = dict(db.session.query(Task.id, Task.end_date).filter(Task.id.in_(list(links))))
+    starts = [add_weekdays(ends[pid], 1 + lag) for pid, lag in links.items() if ends.get(pid)]
+    return max(starts) if starts else None
+
+
+def add_dependency(task, predecessor_id, lag_days=None):
+    """Make predecessor_id a predecessor of task, or set the lag if it
+    already is one (lag_days=None keeps an existing link's lag; new links
+    default to 0). Returns an error message instead if that isn't allowed;
+    the caller commits."""
+    predecessor = Task.query.get(predecessor_id)
+    if predecessor is None or predecessor.project_id != task.project_id:
+        return 'Dependency must be a task in the same project'
+    if predecessor.id == task.id:
+        return 'A task cannot depend on itself'
+    if dependency_graph(task.project_id).would_create_cycle(task.id, predecessor.id):
+        return f'"{predecessor.name}" already depends on "{task.name}"; this would create a cycle'
+
+    link = TaskDependency.query.get((task.id, predecessor.id))
+    if link:
+        if lag_days is not None:
+            link.lag_days = lag_days
+    else:
+        db.session.add(TaskDependency(task_id=task.id, predecessor_id=predecessor.id, lag_days=lag_days or 0))
+    if task.dependency_id is None:
+        task.dependency_id = predecessor.id
+    return None
+
+
+def remove_dependency(task, predecessor_id):
+    """Drop one predecessor; if it was the primary one, promote another"""
+    link = TaskDependency.query.get((task.id, predecessor_id))
+    if link:
+        db.session.delete(link)
+    if task.dependency_id == predecessor_id:
+        remaining = (TaskDependency.query
+                     .filter(TaskDependency.task_id == task.id, TaskDependency.predecessor_id != predecessor_id)
+                     .order_by(TaskDependency.predecessor_id).first())
+        task.dependency_id = remaining.predecessor_id if remaining else None
+
+
+def reschedule_dependents(task):
+    """Move everything downstream of `task` so each task starts after all of
+    its predecessors. Tasks are visited in dependency order, so every task is
+    moved once. Returns the downstream tasks."""
+    graph = dependency_graph(task.project_id)
+    order = graph.descendants_in_order(task.id)
+    if not order:
+        return []
+    tasks_by_id = {t.id: t for t in Task.query.filter_by(project_id=task.project_id)}
+    for task_id in order:
+        tasks_by_id[task_id].adjust_dates_for_dependency(graph, tasks_by_id)
+    return [tasks_by_id[task_id] for task_id in order]
+
+
+# --- project cloning -----------------------------------------------
+def _map_clone_ids(table, map_table, params):
+    """Pair the source project's rows of `table` with the copies just
+    inserted for the new project. Copies are inserted in id order, so the
+    n-th source row maps to the n-th new row."""
+    db.session.execute(db.text(f"CREATE TEMP TABLE IF NOT EXISTS {map_table} "
+                               f"(old_id INTEGER PRIMARY KEY, new_id INTEGER NOT NULL)"))
+    db.session.execute(db.text(f"DELETE FROM {map_table}"))
+    db.session.execute(db.text(f"""
+        INSERT INTO {map_table} (old_id, new_id)
+        SELECT o.id, n.id
+        FROM (SELECT id, row_number() OVER (ORDER BY id) AS rn FROM {table} WHERE project_id = :src) AS o
+        JOIN (SELECT id, row_number() OVER (ORDER BY id) AS rn FROM {table} WHERE project_id = :dst) AS n
+          ON n.rn = o.rn
+    """), params)
+
+
+def clone_project(source, name, description=None, start_date=None):
+    """Copy a project's tasks, todos, materials and variants into a new
+    project with a handful of INSERT ... SELECT statements.
+
+    If start_date is given, every task date is moved by the same number of
+    business days so the earliest task starts on it. Tasks start over as
+    'Not Started' and todos as open; attachments are not copied. The caller
+    commits.
+    """
+    new_proj = Project(name=name, description=source.description if description is None else description)
+    db.session.add(new_proj)
+    db.session.flush()
+
+    shift = 0
+    if start_date:
+        anchor = db.session.query(func.min(Task.start_date)).filter(Task.project_id == source.id).scalar()
+        if anchor:
+            shift = weekdays_between(anchor, start_date)
+
+    params = {'src': source.id, 'dst': new_proj.id, 'shift': shift, 'now': datetime.utcnow()}
+
+    db.session.execute(db.text("""
+        INSERT INTO task (name, category, vendor, start_date, end_date, dependency_id,
+                          status, notes, project_id, created_at)
+        SELECT name, category, vendor,
+               shift_weekdays(start_date, :shift), shift_weekdays(end_date, :shift), dependency_id,
+               'Not Started', notes, :dst, :now
+        FROM task WHERE project_id = :src ORDER BY id
+    """), params)
+    _map_clone_ids('task', 'clone_task_map', params)
+    # dependency_id still points at the source tasks - swap in the copies
+    db.session.execute(db.text("""
+        UPDATE task SET dependency_id = (SELECT new_id FROM clone_task_map WHERE old_id = task.dependency_id)
+        WHERE project_id = :dst AND dependency_id IS NOT NULL
+    """), params)
+    db.session.execute(db.text("""
+        INSERT INTO task_dependency (task_id, predecessor_id, lag_days)
+        SELECT tm.new_id, pm.new_id, d.lag_days
+        FROM task_dependency AS d
+        JOIN clone_task_map AS tm ON tm.old_id = d.task_id
+        JOIN clone_task_map AS pm ON pm.old_id = d.predecessor_id
+    """), params)
+
+    db.session.execute(db.text("""
+        INSERT INTO todo (text, completed, project_id, created_at)
+        SELECT text, 0, :dst, :now FROM todo WHERE project_id = :src ORDER BY id
+    """), params)
+
+    db.session.execute(db.text("""
+        INSERT INTO material (name, task_id, project_id)
+        SELECT m.name, tm.new_id, :dst
+        FROM material AS m LEFT JOIN clone_task_map AS tm ON tm.old_id = m.task_id
+        WHERE m.project_id = :src ORDER BY m.id
+    """), params)
+    _map_clone_ids('material', 'clone_material_map', params)
+    db.session.execute(db.text("""
+        INSERT INTO material_variant (url, note, cost, picked, material_id)
+        SELECT v.url, v.note, v.cost, v.picked, mm.new_id
+        FROM material_variant AS v JOIN clone_material_map AS mm ON mm.old_id = v.material_id
+        ORDER BY v.id
+    """), params)
+
+    return new_proj
+
+
+@app.errorhandler(OperationalError)
+def database_locked(e):
+    """A write that waited out SQLite's busy timeout becomes a 503 the
+    client can recognise and retry, instead of a generic 500"""
+    if 'database is locked' not in str(e.orig):
+        raise e
+    db.session.rollback()
+    response = jsonify({'error': 'database is locked, please try again'})
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    response.headers['X-Database-Locked'] = '1'
+    return response
+
+
 # Home - list projects
 @app.route('/')
 def index():
@@ -206,12 +567,31 @@ def add_project():
         if name.strip() == '':
             flash('Project name cannot be empty.', 'danger')
             return redirect(url_for('add_project'))
+
+        template_id = request.form.get('template_id')
+        if template_id:
+            template = Project.query.get_or_404(template_id)
+            start_date = None
+            start_date_str = request.form.get('start_date')
+            if start_date_str:
+                try:
+                    start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
+                except ValueError:
+                    flash('Invalid start date format. Use YYYY-MM-DD.', 'danger')
+                    return redirect(url_for('add_project', template_id=template_id))
+            new_proj = clone_project(template, name, description or None, start_date)
+            db.session.commit()
+            flash(f'Project created from {template.name}.', 'success')
+            return redirect(url_for('project_detail', project_id=new_proj.id))
+
         new_proj = Project(name=name, description=description)
         db.session.add(new_proj)
         db.session.commit()
         flash('Project created.', 'success')
         return redirect(url_for('index'))
-    return render_template('add_project.html')
+    templates = Project.query.with_entities(Project.id, Project.name).order_by(Project.name).all()
+    return render_template('add_project.html', templates=templates,
+                           template_id=request.args.get('template_id', type=int))
 
 
 # Project detail & tasks
@@ -246,14 +626,15 @@ def project_detail(project_id):
                 return redirect(url_for('project_detail', project_id=project_id))
         
         # Handle dependency logic
-        if dependency_id and dependency_id != '':
-            dependency = Task.query.get(dependency_id)
-            if dependency and dependency.end_date:
-                # Ensure start date is at least 1 business day after dependency end date
-                min_start_date = add_weekdays(dependency.end_date, 1)
-                if start_date and start_date < min_start_date:
-                    start_date = min_start_date
-                    flash(f'Start date adjusted to {start_date.strftime("%Y-%m-%d")} based on dependency.', 'info')
+        dependency = Task.query.get(dependency_id) if dependency_id else None
+        if dependency and dependency.project_id != proj.id:
+            dependency = None
+        if dependency and dependency.end_date:
+            # Ensure start date is at least 1 business day after dependency end date
+            min_start_date = add_weekdays(dependency.end_date, 1)
+            if start_date and start_date < min_start_date:
+                start_date = min_start_date
+                flash(f'Start date adjusted to {start_date.strftime("%Y-%m-%d")} based on dependency.', 'info')
         
         # Adjust dates to weekdays
         if start_date:
@@ -269,11 +650,15 @@ def project_detail(project_id):
             vendor=vendor, 
             start_date=start_date, 
             end_date=end_date, 
-            dependency_id=dependency_id if dependency_id else None,
+            dependency_id=dependency.id if dependency else None,
             status=status, 
             project=proj
         )
         db.session.add(new_task)
+        if dependency:
+            # a brand-new task has no successors, so this can't form a cycle
+            db.session.flush()
+            db.session.add(TaskDependency(task_id=new_task.id, predecessor_id=dependency.id))
         db.session.commit()
         flash('Task added.', 'success')
         return redirect(url_for('project_detail', project_id=project_id))
@@ -298,7 +683,9 @@ def project_detail(project_id):
         if task.end_date and task.end_date < today:
             overdue_tasks.append(task.id)
     
-    return render_template('project_detail.html', project=proj, tasks_json=tasks_json, today=today, overdue_tasks=overdue_tasks)
+    return render_template('project_detail.html', project=proj, tasks_json=tasks_json, today=today, overdue_tasks=overdue_tasks,
+                           dependency_graph=dependency_graph(proj.id),
+                           task_names={t.id: t.name for t in proj.tasks})
 
 
 # Edit the project name and description
@@ -339,6 +726,12 @@ def update_task_status(task_id):
 def delete_task(task_id):
     task = Task.query.get_or_404(task_id)
     project_id = task.project_id
+    # Tasks that had this one as their primary predecessor fall back to
+    # one of their other predecessors
+    for successor in list(task.dependent_tasks):
+        remove_dependency(successor, task.id)
+    db.session.flush()
+    db.session.expire(task, ['dependent_tasks'])
     db.session.delete(task)
     db.session.commit()
     flash('Task deleted.', 'info')
@@ -351,6 +744,7 @@ def delete_project(project_id):
     proj = Project.query.get_or_404(project_id)
     db.session.delete(proj)
     db.session.commit()
+    forget_project_feeds([project_id])
     flash('Project deleted.', 'info')
     return redirect(url_for('index'))
 
@@ -400,14 +794,7 @@ def update_task(task_id):
                 new_start_date = datetime.strptime(data['start_date'], '%Y-%m-%d').date()
                 new_start_date = adjust_to_weekday(new_start_date)
                 
-                # Check dependency constraints for start date
-                if task.dependency_id:
-                    dependency = Task.query.get(task.dependency_id)
-                    if dependency and dependency.end_date:
-                        min_start_date = add_weekdays(dependency.end_date, 1)
-                        if new_start_date < min_start_date:
-                            return jsonify({'error': f'Start date cannot be earlier than {min_start_date.strftime("%Y-%m-%d")} based on dependency'}), 400
-                
+                # checked against the dependencies below, once they are final
                 task.start_date = new_start_date
             except ValueError:
                 return jsonify({'error': 'Invalid start date format'}), 400
@@ -429,43 +816,49 @@ def update_task(task_id):
         else:
             task.end_date = None
     if 'dependency_id' in data:
-        new_dependency_id = data['dependency_id'] if data['dependency_id'] else None
-        
-        # If changing dependency, validate the new dependency
-        if new_dependency_id != task.dependency_id:
-            if new_dependency_id:
-                dependency = Task.query.get(new_dependency_id)
-                if dependency and dependency.end_date and task.start_date:
-                    min_start_date = add_weekdays(dependency.end_date, 1)
-                    if task.start_date < min_start_date:
-                        return jsonify({'error': f'Start date must be at least {min_start_date.strftime("%Y-%m-%d")} based on new dependency'}), 400
+        try:
+            new_dependency_id = int(data['dependency_id']) if data['dependency_id'] else None
+        except (TypeError, ValueError):
+            return jsonify({'error': 'dependency_id must be an integer'}), 400
         
-        task.dependency_id = new_dependency_id
+        # Picking a task that is already a predecessor just makes it the
+        # primary one; picking a new task replaces the primary link. Other
+        # predecessors are managed through /task/<id>/dependencies
+        dependency_changed = new_dependency_id != task.dependency_id
+        if dependency_changed:
+            if new_dependency_id in dependency_graph(task.project_id).predecessors(task.id):
+                task.dependency_id = new_dependency_id
+            else:
+                if task.dependency_id:
+                    remove_dependency(task, task.dependency_id)
+                if new_dependency_id:
+                    error = add_dependency(task, new_dependency_id)
+                    if error:
+                        db.session.rollback()
+                        return jsonify({'error': error}), 400
+                    task.dependency_id = new_dependency_id
+    else:
+        dependency_changed = False
+    
+    # Check dependency constraints for start date, including every
+    # predecessor's lag
+    if task.start_date and ('start_date' in data or dependency_changed):
+        min_start_date = earliest_start(task)
+        if min_start_date and task.start_date < min_start_date:
+            db.session.rollback()
+            return jsonify({'error': f'Start date cannot be earlier than {min_start_date.strftime("%Y-%m-%d")} based on dependencies'}), 400
     if 'status' in data:
         task.status = data['status']
     
     # Handle dependency adjustments when end date changes
     dependent_tasks_updated = []
-    if old_end_date != task.end_date and task.dependent_tasks:
-        # Helper function to collect all tasks in the dependency chain
-        def collect_updated_tasks(task_list, collected_tasks):
-            for t in task_list:
-                # Add this task to collected tasks
-                collected_tasks.append({
-                    'id': t.id,
-                    'start_date': t.start_date.strftime('%Y-%m-%d') if t.start_date else None,
-                    'end_date': t.end_date.strftime('%Y-%m-%d') if t.end_date else None
-                })
-                # Recursively collect dependent tasks
-                if t.dependent_tasks:
-                    collect_updated_tasks(t.dependent_tasks, collected_tasks)
-        
-        # Trigger dependency adjustments for all dependent tasks
-        for dependent_task in task.dependent_tasks:
-            dependent_task.adjust_dates_for_dependency(0)
-        
-        # Collect information about ALL tasks in the dependency chain
-        collect_updated_tasks(task.dependent_tasks, dependent_tasks_updated)
+    if old_end_date != task.end_date:
+        for t in reschedule_dependents(task):
+            dependent_tasks_updated.append({
+                'id': t.id,
+                'start_date': t.start_date.strftime('%Y-%m-%d') if t.start_date else None,
+                'end_date': t.end_date.strftime('%Y-%m-%d') if t.end_date else None
+            })
     
     db.session.commit()
     
@@ -478,6 +871,66 @@ def update_task(task_id):
     })
 
 
+@app.route('/task/<int:task_id>/dependencies', methods=['GET'])
+def get_task_dependencies(task_id):
+    task = Task.query.get_or_404(task_id)
+    graph = dependency_graph(task.project_id)
+    return jsonify({
+        'id': task.id,
+        'dependency_id': task.dependency_id,
+        'predecessors': [{'id': pid, 'lag_days': lag} for pid, lag in sorted(graph.predecessors(task.id).items())],
+        'successors': [{'id': sid, 'lag_days': lag} for sid, lag in sorted(graph.successors(task.id).items())],
+        'ancestors': sorted(graph.ancestors(task.id)),
+        'descendants': sorted(graph.descendants(task.id)),
+    })
+
+
+@app.route('/task/<int:task_id>/dependencies', methods=['POST'])
+def add_task_dependency(task_id):
+    task = Task.query.get_or_404(task_id)
+    data = request.get_json(force=True)
+    try:
+        predecessor_id = int(data.get('predecessor_id'))
+        lag_days = int(data.get('lag_days') or 0)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'predecessor_id and lag_days must be integers'}), 400
+    if lag_days < 0:
+        return jsonify({'error': 'lag_days cannot be negative'}), 400
+
+    error = add_dependency(task, predecessor_id, lag_days)
+    if error:
+        return jsonify({'error': error}), 400
+
+    # Push the task back if it now starts too early (never pull it forward:
+    # its planned dates may be later on purpose), then everything after it
+    graph = dependency_graph(task.project_id)
+    tasks_by_id = {t.id: t for t in Task.query.filter_by(project_id=task.project_id)}
+    moved = []
+    if task.adjust_dates_for_dependency(graph, tasks_by_id, only_later=True):
+        moved = reschedule_dependents(task)
+    db.session.commit()
+    return jsonify({
+        'id': task.id,
+        'start_date': task.start_date.strftime('%Y-%m-%d') if task.start_date else None,
+        'end_date': task.end_date.strftime('%Y-%m-%d') if task.end_date else None,
+        'dependency_id': task.dependency_id,
+        'dependent_tasks_updated': [{
+            'id': t.id,
+            'start_date': t.start_date.strftime('%Y-%m-%d') if t.start_date else None,
+            'end_date': t.end_date.strftime('%Y-%m-%d') if t.end_date else None
+        } for t in moved]
+    }), 201
+
+
+@app.route('/task/<int:task_id>/dependencies/<int:predecessor_id>', methods=['DELETE'])
+def delete_task_dependency(task_id, predecessor_id):
+    task = Task.query.get_or_404(task_id)
+    TaskDependency.query.get_or_404((task_id, predecessor_id))
+    remove_dependency(task, predecessor_id)
+    db.session.commit()
+    return jsonify({'id': task.id, 'dependency_id': task.dependency_id})
+
+
 @app.route('/todo/<int:todo_id>', methods=['DELETE'])
 def delete_todo(todo_id):
     todo = Todo.query.get_or_404(todo_id)
@@ -501,7 +954,7 @@ def upload_file(task_id):
         
         if file:
             # Create uploads directory if it doesn't exist
-            upload_dir = os.path.join(BASE_DIR, 'uploads', str(task_id))
+            upload_dir = os.path.join(UPLOAD_DIR, str(task_id))
             os.makedirs(upload_dir, exist_ok=True)
             
             # Generate unique filename
@@ -599,24 +1052,39 @@ def update_stage(project_id):
     return jsonify({'success': True})
 
 
-@app.route('/materials/<int:project_id>/<task_id>')
-def get_materials(project_id, task_id):
-    if task_id == "general":
-        materials = Material.query.filter_by(project_id=project_id, task_id=None).all()
+def variant_json(v):
+    return {"id": v.id, "url": v.url, "note": v.note, "cost": v.cost, "picked": bool(v.picked)}
+
+
+@app.route('/project/<int:project_id>/materials')
+def project_materials(project_id):
+    """Every material and variant of a project, grouped by task id
+    ("general" for project-wide materials), in two queries. The ETag follows
+    the project version, so a revalidation is one primary-key lookup."""
+    proj = db.session.query(Project.version, Project.created_at).filter_by(id=project_id).first()
+    if proj is None:
+        abort(404)
+    version = proj.version
+    etag = f'materials-{project_revision(project_id, proj.created_at, version)}'
+    if etag in request.if_none_match:
+        response = app.response_class(status=304)
     else:
-        materials = Material.query.filter_by(project_id=project_id, task_id=task_id).all()
-    
-    # Check if each material has a picked variant
-    materials_data = []
-    for m in materials:
-        has_picked = any(v.picked for v in m.variants)
-        materials_data.append({
-            "id": m.id, 
-            "name": m.name,
-            "has_picked": has_picked
-        })
-    
-    return jsonify(materials=materials_data)
+        materials = {}
+        groups = {}
+        for m in Material.query.filter_by(project_id=project_id).order_by(Material.id):
+            materials[m.id] = {"id": m.id, "name": m.name, "task_id": m.task_id, "variants": []}
+            groups.setdefault(str(m.task_id) if m.task_id else "general", []).append(materials[m.id])
+        variants = (MaterialVariant.query
+                    .join(Material, MaterialVariant.material_id == Material.id)
+                    .filter(Material.project_id == project_id)
+                    .order_by(MaterialVariant.id))
+        for v in variants:
+            materials[v.material_id]["variants"].append(variant_json(v))
+        response = jsonify(version=version, groups=groups)
+    response.set_etag(etag)
+    # cacheable, but always revalidated so edits from other users show up
+    response.cache_control.no_cache = True
+    return response
 
 
 @app.route('/materials/add', methods=['POST'])
@@ -629,13 +1097,8 @@ def add_material():
     material = Material(name=name, project_id=project_id, task_id=task_id)
     db.session.add(material)
     db.session.commit()
-    return jsonify(success=True)
-
-
-@app.route("/materials/decision/<int:material_id>")
-def material_decision(material_id):
-    material = Material.query.get_or_404(material_id)
-    return render_template("partials/decision_modal.html", material=material)
+    return jsonify(success=True, material={"id": material.id, "name": material.name,
+                                           "task_id": material.task_id, "variants": []})
 
 
 @app.route("/materials/ordered/<int:material_id>", methods=["POST"])
@@ -692,8 +1155,7 @@ def add_variant():
     db.session.add(variant)
     db.session.commit()
 
-    material = Material.query.get(material_id)
-    return render_template("partials/_variant_list.html", variants=material.variants)
+    return jsonify(material_id=variant.material_id, variant=variant_json(variant)), 201
 
 
 @app.route("/materials/variant/pick", methods=["POST"])
@@ -711,7 +1173,7 @@ def pick_variant():
 
     db.session.commit()
 
-    return jsonify(success=True)
+    return jsonify(success=True, material_id=picked.material_id, picked_id=picked.id)
 
 
 @app.route("/materials/variant/unpick", methods=["POST"])
@@ -726,7 +1188,9 @@ def unpick_variant():
         variant.picked = False
     elif material_id:
         # Unpick all variants for this material
+        material = Material.query.get_or_404(material_id)
         MaterialVariant.query.filter_by(material_id=material_id).update({"picked": False})
+        touch_projects([material.project_id])
     else:
         return jsonify(error="Missing variant_id or material_id"), 400
 
@@ -742,8 +1206,575 @@ def delete_variant(variant_id):
     db.session.delete(variant)
     db.session.commit()
 
-    material = Material.query.get(material_id)
-    return render_template("partials/_variant_list.html", variants=material.variants)
+    return jsonify(success=True, material_id=material_id, deleted_id=variant_id)
+
+
+@app.route('/assets/<path:filename>')
+def asset(filename):
+    """Serve a hashed bundle, preferring a precompressed variant"""
+    dist_dir = os.path.join(STATIC_DIR, assets.DIST_DIRNAME)
+    mimetype = mimetypes.guess_type(filename)[0]
+    for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if request.accept_encodings[encoding] and os.path.isfile(os.path.join(dist_dir, filename + suffix)):
+            response = send_from_directory(dist_dir, filename + suffix, mimetype=mimetype, max_age=ASSET_MAX_AGE)
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_from_directory(dist_dir, filename, mimetype=mimetype, max_age=ASSET_MAX_AGE)
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """Rebuild the hashed, precompressed bundles in static/dist."""
+    manifest = assets.build(STATIC_DIR)
+    for name, filename in sorted(manifest.items()):
+        click.echo(f"✓ {name} -> {filename}")
+    if assets.brotli is None:
+        click.echo("⚠️  brotli not installed - only gzip variants were built")
+
+
+# ------------------------------------------------------------------
+#   Calendar feeds (.ics)
+# ------------------------------------------------------------------
+# Finished feeds keyed by ('project', id) / ('vendor', name), stored with
+# the ETag they were built for; a changed ETag means the entry is stale.
+ICS_CACHE_SIZE = 256
+_ics_cache = OrderedDict()
+_ics_cache_lock = threading.Lock()
+
+
+def _ics_cache_get(key, etag):
+    with _ics_cache_lock:
+        entry = _ics_cache.get(key)
+        if entry and entry[0] == etag:
+            _ics_cache.move_to_end(key)
+            return entry[1]
+    return None
+
+
+def _ics_cache_put(key, etag, body):
+    with _ics_cache_lock:
+        _ics_cache[key] = (etag, body)
+        _ics_cache.move_to_end(key)
+        while len(_ics_cache) > ICS_CACHE_SIZE:
+            _ics_cache.popitem(last=False)
+
+
+def forget_project_feeds(project_ids):
+    """Drop cached feeds of deleted or archived projects"""
+    with _ics_cache_lock:
+        for project_id in project_ids:
+            _ics_cache.pop(('project', project_id), None)
+
+
+def _task_events(query, stamp, with_project=False):
+    """Calendar events for the tasks of a query, read in batches"""
+    for t in query.yield_per(200):
+        if not t.start_date and not t.end_date:
+            continue
+        summary = f'{t.project_name}: {t.name}' if with_project else t.name
+        details = [f'{label}: {value}' for label, value in
+                   (('Status', t.status), ('Vendor', t.vendor), ('Category', t.category)) if value]
+        if t.notes:
+            details.append(t.notes)
+        yield ical.event_lines(f'task-{t.id}@project-tracker', t.start_date, t.end_date,
+                               summary, '\n'.join(details), stamp, t.category)
+
+
+def _ics_response(key, etag, last_modified, name, query, with_project=False):
+    """304 if the client is current, the cached feed if we have it, else
+    stream a fresh one and cache it once it has been sent"""
+    last_modified = (last_modified or datetime.utcnow()).replace(microsecond=0)
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response = app.response_class(status=304)
+    else:
+        body = _ics_cache_get(key, etag)
+        if body is None:
+            chunks = ical.calendar_chunks(name, _task_events(query, last_modified, with_project))
+
+            def generate():
+                sent = []
+                for chunk in chunks:
+                    sent.append(chunk)
+                    yield chunk
+                _ics_cache_put(key, etag, b''.join(sent))
+
+            body = stream_with_context(generate())
+        response = app.response_class(body, mimetype='text/calendar')
+        response.headers['Content-Disposition'] = f'inline; filename="{key[0]}-calendar.ics"'
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    return response
+
+
+def _calendar_task_query():
+    return (db.session.query(Task.id, Task.name, Task.category, Task.vendor, Task.status, Task.notes,
+                             Task.start_date, Task.end_date, Project.name.label('project_name'))
+            .join(Project, Task.project_id == Project.id))
+
+
+@app.route('/project/<int:project_id>/calendar.ics')
+def project_calendar(project_id):
+    proj = (db.session.query(Project.name, Project.version, Project.created_at, Project.updated_at)
+            .filter_by(id=project_id).first())
+    if proj is None:
+        abort(404)
+    query = (_calendar_task_query().filter(Task.project_id == project_id)
+             .order_by(Task.start_date, Task.id))
+    etag = f'ics-project-{project_revision(project_id, proj.created_at, proj.version)}'
+    return _ics_response(('project', project_id), etag,
+                         proj.updated_at, proj.name, query)
+
+
+# path: vendor names like "Plumbing/HVAC Co" contain slashes
+@app.route('/vendor/<path:vendor>/calendar.ics')
+def vendor_calendar(vendor):
+    # The feed changes exactly when one of the projects it draws from does
+    projects = (db.session.query(Project.id, Project.version, Project.created_at, Project.updated_at)
+                .filter(Project.id.in_(db.session.query(Task.project_id).filter(Task.vendor == vendor)))
+                .order_by(Project.id).all())
+    if not projects:
+        abort(404)
+    versions = ','.join(project_revision(p.id, p.created_at, p.version) for p in projects)
+    etag = 'ics-vendor-' + hashlib.sha1(f'{vendor}|{versions}'.encode()).hexdigest()
+    last_modified = max((p.updated_at for p in projects if p.updated_at), default=None)
+    query = (_calendar_task_query().filter(Task.vendor == vendor)
+             .order_by(Task.start_date, Task.id))
+    return _ics_response(('vendor', vendor), etag, last_modified, vendor, query, with_project=True)
+
+
+# ------------------------------------------------------------------
+#   Archive of finished projects
+# ------------------------------------------------------------------
+ARCHIVE_BATCH_SIZE = 50
+# One archive run at a time, so two runs can't pick up the same projects
+_archive_lock = threading.Lock()
+
+# Every row belonging to a batch of projects, tagged with its project
+_ARCHIVE_SELECTS = {
+    'project': "SELECT p.id AS _project_id, p.* FROM project AS p WHERE p.id IN :ids",
+    'task': "SELECT t.project_id AS _project_id, t.* FROM task AS t WHERE t.project_id IN :ids",
+    'task_dependency': """SELECT t.project_id AS _project_id, d.* FROM task_dependency AS d
+                          JOIN task AS t ON t.id = d.task_id WHERE t.project_id IN :ids""",
+    'todo': "SELECT t.project_id AS _project_id, t.* FROM todo AS t WHERE t.project_id IN :ids",
+    'material': "SELECT m.project_id AS _project_id, m.* FROM material AS m WHERE m.project_id IN :ids",
+    'material_variant': """SELECT m.project_id AS _project_id, v.* FROM material_variant AS v
+                           JOIN material AS m ON m.id = v.material_id WHERE m.project_id IN :ids""",
+    'task_attachment': """SELECT t.project_id AS _project_id, a.* FROM task_attachment AS a
+                          JOIN task AS t ON t.id = a.task_id WHERE t.project_id IN :ids""",
+}
+
+# Children first
+_ARCHIVE_DELETES = (
+    """DELETE FROM task_dependency WHERE task_id IN (SELECT id FROM task WHERE project_id IN :ids)
+                                      OR predecessor_id IN (SELECT id FROM task WHERE project_id IN :ids)""",
+    "DELETE FROM task_attachment WHERE task_id IN (SELECT id FROM task WHERE project_id IN :ids)",
+    "DELETE FROM material_variant WHERE material_id IN (SELECT id FROM material WHERE project_id IN :ids)",
+    "DELETE FROM material WHERE project_id IN :ids",
+    "DELETE FROM todo WHERE project_id IN :ids",
+    "DELETE FROM task WHERE project_id IN :ids",
+    "DELETE FROM project WHERE id IN :ids",
+)
+
+
+def _in_ids(sql):
+    return db.text(sql).bindparams(db.bindparam('ids', expanding=True))
+
+
+def archive_projects(projects):
+    """Move the given projects and everything in them into archived_project.
+    Each table is read and cleared with one statement for the whole batch.
+    Attachment files stay in the uploads directory. Returns the new
+    ArchivedProject rows; the caller commits."""
+    ids = [p.id for p in projects]
+    if not ids:
+        return []
+    params = {'ids': ids}
+
+    tables = {pid: {table: [] for table in archive.TABLES} for pid in ids}
+    for table, sql in _ARCHIVE_SELECTS.items():
+        for row in db.session.execute(_in_ids(sql), params).mappings():
+            row = dict(row)
+            tables[row.pop('_project_id')][table].append(row)
+    for pid in ids:
+        for row in tables[pid]['task_attachment']:
+            row['file_path'] = archive.relative_upload_path(row['file_path'], UPLOAD_DIR)
+
+    archived = []
+    for p in projects:
+        entry = ArchivedProject(
+            project_id=p.id, name=p.name, description=p.description, stage=p.stage,
+            created_at=p.created_at, task_count=len(tables[p.id]['task']),
+            search_text=archive.search_text(tables[p.id]), payload=archive.pack(tables[p.id]),
+        )
+        db.session.add(entry)
+        archived.append(entry)
+
+    # Tasks elsewhere that still name an archived task as their dependency
+    others = db.session.execute(_in_ids("""
+        SELECT DISTINCT project_id FROM task
+        WHERE project_id NOT IN :ids AND dependency_id IN (SELECT id FROM task WHERE project_id IN :ids)
+    """), params).scalars().all()
+    if others:
+        db.session.execute(_in_ids("""
+            UPDATE task SET dependency_id = NULL
+            WHERE project_id NOT IN :ids AND dependency_id IN (SELECT id FROM task WHERE project_id IN :ids)
+        """), params)
+        touch_projects(others)
+
+    for sql in _ARCHIVE_DELETES:
+        db.session.execute(_in_ids(sql), params)
+    forget_project_feeds(ids)
+    return archived
+
+
+def finished_projects(older_than_days):
+    """Complete projects nobody has touched for older_than_days"""
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    return (Project.query
+            .filter(Project.stage == 'Complete',
+                    func.coalesce(Project.updated_at, Project.created_at) <= cutoff)
+            .order_by(Project.id))
+
+
+def archive_finished_projects(older_than_days, batch_size=ARCHIVE_BATCH_SIZE):
+    """Archive finished projects batch by batch, committing after each one
+    so the database is never locked for long. Returns how many were archived."""
+    total = 0
+    while True:
+        batch = finished_projects(older_than_days).limit(batch_size).all()
+        if not batch:
+            return total
+        archive_projects(batch)
+        db.session.commit()
+        total += len(batch)
+
+
+def _restore_rows(table, rows, remap):
+    """Insert archived rows into `table`, translating the columns in `remap`
+    through the id maps of tables restored before it. A row keeps its old
+    id unless that has been taken since. Returns {old id: new id}."""
+    columns = {row[1] for row in db.session.execute(db.text(f"PRAGMA table_info({table})"))}
+    has_id = 'id' in columns
+    taken = set()
+    if has_id and rows:
+        taken = set(db.session.execute(_in_ids(f"SELECT id FROM {table} WHERE id IN :ids"),
+                                       {'ids': [r['id'] for r in rows]}).scalars())
+
+    id_map = {}
+    # Rows keeping their id go first, so the ids handed out to the rest
+    # can't collide with them
+    for row in sorted(rows, key=lambda r: has_id and r['id'] in taken):
+        values = {c: v for c, v in row.items() if c in columns}
+        for column, mapping in remap.items():
+            if values.get(column) is not None:
+                values[column] = mapping.get(values[column])
+        if has_id and values['id'] in taken:
+            del values['id']
+        result = db.session.execute(db.text(
+            f"INSERT INTO {table} ({', '.join(values)}) VALUES ({', '.join(':' + c for c in values)})"
+        ), values)
+        if has_id:
+            id_map[row['id']] = values.get('id', result.lastrowid)
+    return id_map
+
+
+def restore_archived_project(entry):
+    """Put an archived project back into the live tables and drop the
+    archive row. Returns the project's id; the caller commits."""
+    tables = archive.unpack(entry.payload)
+
+    project_map = _restore_rows('project', tables['project'], {})
+    # dependency_id can point at a task that isn't in yet; fill it in after
+    task_map = _restore_rows('task', [dict(t, dependency_id=None) for t in tables['task']],
+                             {'project_id': project_map})
+    for t in tables['task']:
+        if t.get('dependency_id') in task_map:
+            db.session.execute(db.text("UPDATE task SET dependency_id = :dep WHERE id = :id"),
+                               {'dep': task_map[t['dependency_id']], 'id': task_map[t['id']]})
+    _restore_rows('task_dependency', tables['task_dependency'],
+                  {'task_id': task_map, 'predecessor_id': task_map})
+    _restore_rows('todo', tables['todo'], {'project_id': project_map})
+    material_map = _restore_rows('material', tables['material'],
+                                 {'project_id': project_map, 'task_id': task_map})
+    _restore_rows('material_variant', tables['material_variant'], {'material_id': material_map})
+    _restore_rows('task_attachment',
+                  [dict(a, file_path=archive.absolute_upload_path(a['file_path'], UPLOAD_DIR))
+                   for a in tables['task_attachment']],
+                  {'task_id': task_map})
+
+    project_id = project_map[entry.project_id]
+    # New version, so nothing cached under the old one is served again
+    touch_projects([project_id])
+    db.session.delete(entry)
+    return project_id
+
+
+@app.route('/project/<int:project_id>/archive', methods=['POST'])
+def archive_project(project_id):
+    proj = Project.query.get_or_404(project_id)
+    if proj.stage != 'Complete':
+        flash('Only projects in the Complete stage can be archived.', 'warning')
+        return redirect(url_for('index'))
+    name = proj.name
+    with _archive_lock:
+        archive_projects([proj])
+        db.session.commit()
+    flash(f'Project "{name}" archived.', 'info')
+    return redirect(url_for('index'))
+
+
+@app.route('/archive')
+def archived_projects():
+    q = request.args.get('q', '').strip()
+    query = ArchivedProject.query
+    for term in q.lower().split():
+        query = query.filter(ArchivedProject.search_text.contains(term, autoescape=True))
+    entries = query.order_by(ArchivedProject.archived_at.desc()).all()
+    return render_template('archive.html', entries=entries, q=q)
+
+
+@app.route('/archive/<int:archive_id>/restore', methods=['POST'])
+def restore_archived(archive_id):
+    entry = ArchivedProject.query.get_or_404(archive_id)
+    project_id = restore_archived_project(entry)
+    db.session.commit()
+    flash('Project restored from the archive.', 'success')
+    return redirect(url_for('project_detail', project_id=project_id))
+
+
+@app.route('/admin/archive', methods=['POST'])
+def archive_projects_batch():
+    if not admin_authorized():
+        abort(403)
+    data = request.get_json(silent=True) or {}
+    try:
+        older_than_days = int(data.get('older_than_days', 30))
+        batch_size = int(data.get('batch_size', ARCHIVE_BATCH_SIZE))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'older_than_days and batch_size must be integers'}), 400
+    if batch_size < 1:
+        return jsonify({'error': 'batch_size must be at least 1'}), 400
+    if not _archive_lock.acquire(blocking=False):
+        return jsonify({'error': 'archive already running'}), 409
+    try:
+        archived = archive_finished_projects(older_than_days, batch_size)
+    finally:
+        _archive_lock.release()
+    return jsonify({'archived': archived})
+
+
+@app.cli.command('archive-projects')
+@click.option('--older-than-days', default=30, show_default=True,
+              help='Only archive Complete projects unchanged for this long.')
+@click.option('--batch-size', default=ARCHIVE_BATCH_SIZE, show_default=True)
+def archive_projects_command(older_than_days, batch_size):
+    """Move finished projects out of the live tables."""
+    with _archive_lock:
+        archived = archive_finished_projects(older_than_days, batch_size)
+    click.echo(f"✓ Archived {archived} project(s)")
+
+
+@app.cli.command('restore-archived')
+@click.argument('archive_id', type=int)
+def restore_archived_command(archive_id):
+    """Bring archived project ARCHIVE_ID back (see /archive for ids)."""
+    entry = ArchivedProject.query.get(archive_id)
+    if entry is None:
+        raise click.ClickException(f'no archived project {archive_id}')
+    project_id = restore_archived_project(entry)
+    db.session.commit()
+    click.echo(f"✓ Restored {entry.name} as project {project_id}")
+
+
+# ------------------------------------------------------------------
+#   Backups
+# ------------------------------------------------------------------
+# Only one snapshot at a time; a second request gets a 409 instead of
+# queueing behind the first.
+_backup_lock = threading.Lock()
+
+
+def admin_authorized():
+    """True if the request carries the configured admin token"""
+    token = app.config.get('ADMIN_TOKEN')
+    if not token:
+        return False
+    supplied = request.headers.get('X-Admin-Token') or request.args.get('token', '')
+    # compare bytes: compare_digest rejects str with non-ASCII characters
+    return hmac.compare_digest(supplied.encode('utf-8'), token.encode('utf-8'))
+
+
+@app.route('/admin/backup', methods=['POST'])
+def create_backup():
+    if not admin_authorized():
+        abort(403)
+    if not _backup_lock.acquire(blocking=False):
+        return jsonify({'error': 'backup already running'}), 409
+    try:
+        manifest = backup.create_snapshot(DB_PATH, UPLOAD_DIR, BACKUP_DIR)
+    except sqlite3.Error as e:
+        return jsonify({'error': f'cannot read database {DB_PATH}: {e}'}), 500
+    finally:
+        _backup_lock.release()
+    return jsonify({
+        'name': manifest['name'],
+        'files': len(manifest['files']),
+        'blobs_copied': manifest['blobs_copied'],
+        'missing_attachments': manifest['missing_attachments'],
+    }), 201
+
+
+@app.route('/admin/backups')
+def list_backups():
+    if not admin_authorized():
+        abort(403)
+    return jsonify({'snapshots': backup.list_snapshots(BACKUP_DIR)})
+
+
+@app.route('/admin/backup/<name>/verify')
+def verify_backup(name):
+    if not admin_authorized():
+        abort(403)
+    if name not in backup.list_snapshots(BACKUP_DIR):
+        abort(404)
+    problems = backup.verify_snapshot(BACKUP_DIR, name)
+    return jsonify({'name': name, 'ok': not problems, 'problems': problems})
+
+
+@app.cli.command('backup')
+def backup_command():
+    """Take a snapshot of tracker.db and the uploads directory."""
+    with _backup_lock:
+        try:
+            manifest = backup.create_snapshot(DB_PATH, UPLOAD_DIR, BACKUP_DIR)
+        except sqlite3.Error as e:
+            raise click.ClickException(f'cannot read database {DB_PATH}: {e}')
+    click.echo(f"✓ Snapshot {manifest['name']}: {len(manifest['files'])} files, "
+               f"{manifest['blobs_copied']} new blobs")
+    if manifest['missing_attachments']:
+        click.echo(f"⚠️  Attachments without a file: {manifest['missing_attachments']}")
+
+
+@app.cli.command('verify-backup')
+@click.argument('name', required=False)
+def verify_backup_command(name):
+    """Check a snapshot (default: the latest) against its manifest."""
+    snapshots = backup.list_snapshots(BACKUP_DIR)
+    if not snapshots:
+        raise click.ClickException('no snapshots found')
+    name = name or snapshots[-1]
+    problems = backup.verify_snapshot(BACKUP_DIR, name)
+    for problem in problems:
+        click.echo(f"⚠️  {problem}")
+    if problems:
+        raise click.ClickException(f'snapshot {name} failed verification')
+    click.echo(f"✓ Snapshot {name} verified")
+
+
+@app.cli.command('restore-backup')
+@click.argument('name')
+@click.argument('target_dir')
+def restore_backup_command(name, target_dir):
+    """Restore snapshot NAME into TARGET_DIR (never over the live data)."""
+    try:
+        target_db = backup.restore_snapshot(BACKUP_DIR, name, os.path.abspath(target_dir))
+    except (OSError, ValueError) as e:
+        raise click.ClickException(str(e))
+    click.echo(f"✓ Restored {name} to {target_db}")
+
+
+# ------------------------------------------------------------------
+#   Request profiling
+# ------------------------------------------------------------------
+@app.before_request
+def start_profiling():
+    if not app.config['PROFILING_ENABLED']:
+        return
+    if request.headers.get('X-Profile') != '1' and request.args.get('_profile') != '1':
+        return
+    if not admin_authorized():
+        return
+    g.profile = profiler.RequestProfile(threading.get_ident(), app.config['PROFILING_INTERVAL'])
+    g.profile.start()
+
+
+def _finish_profile(profile, name, request_info, status):
+    if profile.running:
+        profile.stop()
+        profile.save(PROFILE_DIR, name, *request_info, status)
+
+
+def _profile_request_info():
+    # the documented ?_profile=1&token=... flow must not write the admin
+    # token into profiles/ or onto /admin/profiles
+    args = [(k, v) for k, v in request.args.items(multi=True) if k != 'token']
+    path = request.path + ('?' + urlencode(args) if args else '')
+    return request.method, path, request.endpoint
+
+
+@app.after_request
+def stop_profiling(response):
+    profile = g.get('profile')
+    if profile is None:
+        return response
+    name = profiler.new_name(request.endpoint)
+    response.headers['X-Profile-Id'] = name
+    request_info = _profile_request_info()
+    if response.is_streamed:
+        # A streamed body (e.g. calendar.ics) is only generated after this
+        # hook returns; keep sampling until the server has sent all of it
+        g.profile_streaming = True
+        response.call_on_close(lambda: _finish_profile(profile, name, request_info, response.status_code))
+    else:
+        g.pop('profile')
+        _finish_profile(profile, name, request_info, response.status_code)
+    return response
+
+
+@app.teardown_request
+def stop_profiling_on_error(exc):
+    # after_request is skipped when a view raises; keep those profiles too
+    if 'profile' in g and not g.get('profile_streaming'):
+        _finish_profile(g.pop('profile'), profiler.new_name(request.endpoint), _profile_request_info(), 500)
+
+
+def _profile_query_start(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'profile' in g:
+        conn.info.setdefault('profile_query_start', []).append(time.perf_counter())
+
+
+def _profile_query_end(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('profile_query_start')
+    if starts and has_request_context() and 'profile' in g:
+        g.profile.record_query(statement, time.perf_counter() - starts.pop())
+
+
+if app.config['PROFILING_ENABLED']:
+    # Only hooked in when profiling is on, so normal queries never run them
+    event.listen(Engine, 'before_cursor_execute', _profile_query_start)
+    event.listen(Engine, 'after_cursor_execute', _profile_query_end)
+
+
+@app.route('/admin/profiles')
+def list_request_profiles():
+    if not admin_authorized():
+        abort(403)
+    return render_template('admin_profiles.html', profiles=profiler.list_profiles(PROFILE_DIR),
+                           enabled=app.config['PROFILING_ENABLED'], token=request.args.get('token', ''))
+
+
+@app.route('/admin/profiles/<name>.<any(folded, json):kind>')
+def download_request_profile(name, kind):
+    if not admin_authorized():
+        abort(403)
+    return send_from_directory(PROFILE_DIR, f'{name}.{kind}', mimetype='text/plain' if kind == 'folded' else None,
+                               as_attachment=kind == 'folded')
 
 
 # --- helper to build tables ----------------------------------------
@@ -801,8 +1832,7 @@ def init_db():
             print(f"⚠️  Error checking/migrating task table: {e}")
         
         # Create uploads directory
-        uploads_dir = os.path.join(BASE_DIR, 'uploads')
-        os.makedirs(uploads_dir, exist_ok=True)
+        os.makedirs(UPLOAD_DIR, exist_ok=True)
         print("✓ Uploads directory created")
         
         # Ensure TaskAttachment table exists
@@ -833,6 +1863,40 @@ def init_db():
         except Exception as e:
             print(f"⚠️  Error checking/creating TaskAttachment table: {e}")
         
+        # Add version/updated_at to project if they don't exist
+        try:
+            with db.engine.connect() as conn:
+                result = conn.execute(db.text("PRAGMA table_info(project)"))
+                columns = [row[1] for row in result.fetchall()]
+
+                if 'version' not in columns:
+                    conn.execute(db.text("ALTER TABLE project ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+                    conn.execute(db.text("ALTER TABLE project ADD COLUMN updated_at DATETIME"))
+                    conn.execute(db.text("UPDATE project SET updated_at = created_at"))
+                    conn.commit()
+                    print("✓ Added version columns to project table")
+                else:
+                    print("✓ Project version columns already exist")
+        except Exception as e:
+            print(f"⚠️  Error checking/adding project version columns: {e}")
+
+        # Copy single dependency_id links into task_dependency
+        try:
+            with db.engine.connect() as conn:
+                result = conn.execute(db.text("""
+                    INSERT OR IGNORE INTO task_dependency (task_id, predecessor_id, lag_days)
+                    SELECT t.id, t.dependency_id, 0
+                    FROM task AS t JOIN task AS p ON p.id = t.dependency_id AND p.project_id = t.project_id
+                    WHERE t.dependency_id != t.id
+                """))
+                conn.commit()
+                if result.rowcount:
+                    print(f"✓ Migrated {result.rowcount} task dependencies to task_dependency")
+                else:
+                    print("✓ Task dependencies already migrated")
+        except Exception as e:
+            print(f"⚠️  Error migrating task dependencies: {e}")
+
         print("✓ Database initialized (tracker.db)")
 
 
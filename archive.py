@@ -0,0 +1,64 @@
+"""Compressed cold storage for finished projects.
+
+An archived project is a single row: the project and every row under it
+(tasks, dependencies, todos, materials, variants and attachment records),
+serialised as JSON and zlib-compressed, next to a few plain columns used to
+list and search the archive.  Attachment files stay where they are in the
+uploads directory; their records keep a path relative to it so a restore
+works after the uploads have been moved (e.g. by restore-backup).
+"""
+import json
+import os
+import zlib
+
+
+FORMAT_VERSION = 1
+
+# Parents before children: the order rows are restored in
+TABLES = ('project', 'task', 'task_dependency', 'todo', 'material', 'material_variant', 'task_attachment')
+
+# Columns whose text ends up in the search index, per table
+SEARCH_COLUMNS = {
+    'project': ('name', 'description'),
+    'task': ('name', 'category', 'vendor', 'notes'),
+    'todo': ('text',),
+    'material': ('name',),
+    'material_variant': ('note', 'url'),
+    'task_attachment': ('original_filename',),
+}
+
+
+def pack(tables):
+    """Compress {table: [row dict, ...]} into the stored payload"""
+    data = json.dumps({'format': FORMAT_VERSION, 'tables': tables}, separators=(',', ':'))
+    return zlib.compress(data.encode('utf-8'), 9)
+
+
+def unpack(payload):
+    """Inverse of pack; returns {table: [row dict, ...]}"""
+    data = json.loads(zlib.decompress(payload).decode('utf-8'))
+    if data.get('format') != FORMAT_VERSION:
+        raise ValueError(f"unsupported archive format {data.get('format')!r}")
+    return {table: data['tables'].get(table, []) for table in TABLES}
+
+
+def search_text(tables):
+    """Lower-cased text of a project's rows, one field per line"""
+    parts = []
+    for table, columns in SEARCH_COLUMNS.items():
+        for row in tables.get(table, ()):
+            parts.extend(str(row[c]) for c in columns if row.get(c))
+    return '\n'.join(parts).lower()
+
+
+def relative_upload_path(path, uploads_dir):
+    """Path of an attachment relative to the uploads directory, if it is in it"""
+    uploads_dir = os.path.abspath(uploads_dir)
+    path = os.path.abspath(path)
+    if os.path.commonpath([path, uploads_dir]) == uploads_dir:
+        return os.path.relpath(path, uploads_dir)
+    return path
+
+
+def absolute_upload_path(path, uploads_dir):
+    return os.path.join(uploads_dir, path)
@@ -0,0 +1,150 @@
+"""Build the static bundles served from /assets/.
+
+Each entry in ``BUNDLES`` is concatenated from files under ``static/`` into
+``static/dist/<name>.<hash>.<ext>``.  The hash is taken from the content, so
+a bundle's URL changes whenever it does and browsers can cache it forever.
+Text bundles also get ``.gz`` (and, if the ``brotli`` package is installed,
+``.br``) siblings so they are compressed once at build time rather than on
+every request.  ``manifest.json`` maps bundle names to the hashed files.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+
+try:
+    import brotli
+except ImportError:  # optional - without it we only ship gzip variants
+    brotli = None
+
+
+BUNDLES = {
+    'app.css': [
+        'vendor/bootstrap/bootstrap.min.css',
+        'vendor/bootstrap-icons/bootstrap-icons.min.css',
+        'css/app.css',
+    ],
+    'vendor.js': [
+        'vendor/bootstrap/popper.min.js',
+        'vendor/bootstrap/bootstrap.min.js',
+    ],
+    'project_detail.js': [
+        'js/page.js',
+        'js/todos.js',
+        'js/task_edit.js',
+        'js/stage.js',
+        'js/notes.js',
+        'js/materials.js',
+        'js/mobile.js',
+        'js/dependencies.js',
+    ],
+}
+
+DIST_DIRNAME = 'dist'
+MANIFEST_FILENAME = 'manifest.json'
+COMPRESSIBLE = ('.css', '.js', '.svg')
+
+_SOURCE_MAP = re.compile(r'^\s*(//|/\*)# sourceMappingURL=.*$', re.M)
+_CSS_URL = re.compile(r'url\((["\']?)([^)"\']+)\1\)')
+
+
+def _hashed_name(name, content):
+    stem, ext = os.path.splitext(name)
+    return f'{stem}.{hashlib.sha256(content).hexdigest()[:12]}{ext}'
+
+
+def _write_atomic(path, content):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as fh:
+        fh.write(content)
+    os.replace(tmp, path)
+
+
+def _emit(dist_dir, filename, content):
+    """Write a hashed file and its precompressed variants.
+
+    Names are content hashes, so an existing file is already correct and is
+    left alone.  Variants that don't come out smaller are not written.
+    """
+    path = os.path.join(dist_dir, filename)
+    if os.path.exists(path):
+        return
+    if filename.endswith(COMPRESSIBLE):
+        gz = gzip.compress(content, compresslevel=9, mtime=0)
+        if len(gz) < len(content):
+            _write_atomic(path + '.gz', gz)
+        if brotli is not None:
+            br = brotli.compress(content, quality=11)
+            if len(br) < len(content):
+                _write_atomic(path + '.br', br)
+    # the plain file goes last: its presence means the variants are done
+    _write_atomic(path, content)
+
+
+def _rewrite_css_urls(css, source_path, dist_dir):
+    """Copy files a stylesheet refers to (fonts, images) into dist as hashed
+    files and point the ``url()`` at them."""
+    def replace(match):
+        quote, ref = match.groups()
+        if ref.startswith(('data:', 'http:', 'https:', '/', '#')):
+            return match.group(0)
+        rel = re.split(r'[?#]', ref, maxsplit=1)[0]
+        target = os.path.normpath(os.path.join(os.path.dirname(source_path), rel))
+        with open(target, 'rb') as fh:
+            content = fh.read()
+        hashed = _hashed_name(os.path.basename(rel), content)
+        _emit(dist_dir, hashed, content)
+        return f'url({quote}{hashed}{quote})'
+    return _CSS_URL.sub(replace, css)
+
+
+def _source_path(static_dir, rel):
+    return os.path.join(static_dir, *rel.split('/'))
+
+
+def build(static_dir):
+    """Build every bundle and return the new manifest"""
+    dist_dir = os.path.join(static_dir, DIST_DIRNAME)
+    os.makedirs(dist_dir, exist_ok=True)
+
+    manifest = {}
+    for name, sources in BUNDLES.items():
+        parts = []
+        for rel in sources:
+            path = _source_path(static_dir, rel)
+            with open(path, encoding='utf-8') as fh:
+                text = _SOURCE_MAP.sub('', fh.read()).strip()
+            if name.endswith('.css'):
+                text = _rewrite_css_urls(text, path, dist_dir)
+            parts.append(f'/* {rel} */\n{text}\n')
+        # a stray statement without a trailing semicolon must not run into
+        # the next file
+        separator = ';\n' if name.endswith('.js') else '\n'
+        content = separator.join(parts).encode('utf-8')
+        hashed = _hashed_name(name, content)
+        _emit(dist_dir, hashed, content)
+        manifest[name] = hashed
+
+    _write_atomic(os.path.join(dist_dir, MANIFEST_FILENAME),
+                  json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    return manifest
+
+
+def load_manifest(static_dir):
+    """Return the built manifest, or None if it is missing or out of date"""
+    path = os.path.join(static_dir, DIST_DIRNAME, MANIFEST_FILENAME)
+    try:
+        built_at = os.path.getmtime(path)
+        with open(path) as fh:
+            manifest = json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+    if set(manifest) != set(BUNDLES):
+        return None
+    for sources in BUNDLES.values():
+        for rel in sources:
+            if os.path.getmtime(_source_path(static_dir, rel)) > built_at:
+                return None
+    return manifest
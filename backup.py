@@ -0,0 +1,272 @@
+"""Online backups of the tracker database and the attachment store.
+
+A backup directory looks like this::
+
+    backups/
+        blobs/ab/ab12...        content-addressed copies of uploaded files
+        20240101T120000Z/
+            tracker.db          consistent copy made with SQLite's backup API
+            manifest.json       checksums of the database and every upload
+
+Blobs are shared between snapshots, so each run only copies attachments that
+were not backed up before.  None of this needs the app to stop serving
+requests: the database is copied a few pages at a time and the uploads are
+only ever read.
+"""
+import hashlib
+import json
+import os
+import pathlib
+import shutil
+import sqlite3
+from datetime import datetime
+
+
+DB_FILENAME = 'tracker.db'
+MANIFEST_FILENAME = 'manifest.json'
+BLOB_DIRNAME = 'blobs'
+PARTIAL_SUFFIX = '.partial'
+
+# Pages copied per backup step and the pause between steps.  The pause is
+# what lets writers get the lock back while a backup is running.
+BACKUP_PAGES = 256
+BACKUP_SLEEP = 0.005
+
+
+def _sha256(path):
+    """Return the hex SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _blob_path(backup_dir, digest):
+    return os.path.join(backup_dir, BLOB_DIRNAME, digest[:2], digest)
+
+
+def copy_database(src_path, dest_path, pages=BACKUP_PAGES, sleep=BACKUP_SLEEP):
+    """Copy a live SQLite database with the online backup API.
+
+    The copy is made ``pages`` pages at a time, sleeping between steps so
+    other connections can keep reading and writing. The source is opened
+    read-only, so a wrong path raises instead of creating an empty database.
+    """
+    src = sqlite3.connect(pathlib.Path(src_path).absolute().as_uri() + '?mode=ro', uri=True)
+    dest = sqlite3.connect(dest_path)
+    try:
+        src.backup(dest, pages=pages, sleep=sleep)
+    finally:
+        dest.close()
+        src.close()
+
+
+def list_snapshots(backup_dir):
+    """Return the names of finished snapshots, oldest first"""
+    if not os.path.isdir(backup_dir):
+        return []
+    names = []
+    for name in os.listdir(backup_dir):
+        if name == BLOB_DIRNAME or name.endswith(PARTIAL_SUFFIX):
+            continue
+        if os.path.isfile(os.path.join(backup_dir, name, MANIFEST_FILENAME)):
+            names.append(name)
+    return sorted(names)
+
+
+def load_manifest(snapshot_dir):
+    with open(os.path.join(snapshot_dir, MANIFEST_FILENAME)) as fh:
+        return json.load(fh)
+
+
+def _snapshot_uploads(uploads_dir, backup_dir, previous_files):
+    """Copy new upload blobs into the blob store and describe every file.
+
+    Files whose size and mtime match the previous manifest are not hashed
+    again, so an unchanged attachment store costs one ``stat`` per file.
+    """
+    files = {}
+    copied = 0
+    if not os.path.isdir(uploads_dir):
+        return files, copied
+
+    for root, _dirs, names in os.walk(uploads_dir):
+        for name in names:
+            path = os.path.join(root, name)
+            rel = os.path.relpath(path, uploads_dir).replace(os.sep, '/')
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue  # deleted while we were walking
+
+            prev = previous_files.get(rel)
+            if prev and prev['size'] == st.st_size and prev['mtime'] == st.st_mtime_ns:
+                digest = prev['sha256']
+            else:
+                try:
+                    digest = _sha256(path)
+                except FileNotFoundError:
+                    continue
+
+            blob = _blob_path(backup_dir, digest)
+            if not os.path.exists(blob):
+                os.makedirs(os.path.dirname(blob), exist_ok=True)
+                tmp = blob + PARTIAL_SUFFIX
+                try:
+                    shutil.copyfile(path, tmp)
+                except FileNotFoundError:
+                    continue
+                os.replace(tmp, blob)
+                copied += 1
+
+            files[rel] = {'sha256': digest, 'size': st.st_size, 'mtime': st.st_mtime_ns}
+    return files, copied
+
+
+def _missing_attachments(db_path, uploads_dir, files):
+    """Attachment rows in the copied database whose file is not in the snapshot"""
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute("SELECT id, file_path FROM task_attachment").fetchall()
+    except sqlite3.OperationalError:
+        return []
+    finally:
+        conn.close()
+
+    missing = []
+    for attachment_id, file_path in rows:
+        rel = os.path.relpath(file_path, uploads_dir).replace(os.sep, '/')
+        if rel not in files:
+            missing.append(attachment_id)
+    return missing
+
+
+def create_snapshot(db_path, uploads_dir, backup_dir):
+    """Take a new snapshot and return its manifest.
+
+    The database is copied before the uploads are walked, so every file an
+    attachment row points at has already been written when we look for it.
+    The snapshot directory is only renamed into place once the manifest is
+    complete; an interrupted run leaves a ``.partial`` directory behind and
+    never a half-written snapshot.
+    """
+    os.makedirs(backup_dir, exist_ok=True)
+    name = datetime.utcnow().strftime('%Y%m%dT%H%M%S%fZ')
+    final_dir = os.path.join(backup_dir, name)
+    work_dir = final_dir + PARTIAL_SUFFIX
+    os.makedirs(work_dir)
+
+    previous_files = {}
+    snapshots = list_snapshots(backup_dir)
+    if snapshots:
+        previous_files = load_manifest(os.path.join(backup_dir, snapshots[-1])).get('files', {})
+
+    db_copy = os.path.join(work_dir, DB_FILENAME)
+    try:
+        copy_database(db_path, db_copy)
+    except sqlite3.Error:
+        # nothing worth keeping yet
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise
+    files, copied = _snapshot_uploads(uploads_dir, backup_dir, previous_files)
+
+    manifest = {
+        'format': 1,
+        'name': name,
+        'created_at': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+        'uploads_dir': uploads_dir,
+        'database': {
+            'file': DB_FILENAME,
+            'sha256': _sha256(db_copy),
+            'size': os.path.getsize(db_copy),
+        },
+        'files': files,
+        'blobs_copied': copied,
+        'missing_attachments': _missing_attachments(db_copy, uploads_dir, files),
+    }
+    with open(os.path.join(work_dir, MANIFEST_FILENAME), 'w') as fh:
+        json.dump(manifest, fh, indent=2, sort_keys=True)
+
+    os.replace(work_dir, final_dir)
+    return manifest
+
+
+def verify_snapshot(backup_dir, name):
+    """Check a snapshot against its manifest and return a list of problems.
+
+    An empty list means the database copy passes SQLite's integrity check and
+    every blob the manifest refers to is present with the right checksum.
+    """
+    snapshot_dir = os.path.join(backup_dir, name)
+    try:
+        manifest = load_manifest(snapshot_dir)
+    except (OSError, ValueError) as e:
+        return [f'manifest unreadable: {e}']
+
+    problems = []
+    db_copy = os.path.join(snapshot_dir, manifest['database']['file'])
+    if not os.path.exists(db_copy):
+        problems.append('database copy missing')
+    elif _sha256(db_copy) != manifest['database']['sha256']:
+        problems.append('database checksum mismatch')
+    else:
+        conn = sqlite3.connect(db_copy)
+        try:
+            result = conn.execute('PRAGMA integrity_check').fetchone()[0]
+        finally:
+            conn.close()
+        if result != 'ok':
+            problems.append(f'database integrity check failed: {result}')
+
+    checked = {}
+    for rel, entry in manifest['files'].items():
+        digest = entry['sha256']
+        if digest not in checked:
+            blob = _blob_path(backup_dir, digest)
+            checked[digest] = os.path.exists(blob) and _sha256(blob) == digest
+        if not checked[digest]:
+            problems.append(f'blob for {rel} missing or corrupt')
+    return problems
+
+
+def restore_snapshot(backup_dir, name, target_dir):
+    """Restore a snapshot into ``target_dir`` and return the new database path.
+
+    The target gets its own ``tracker.db`` and ``uploads/`` tree.  Attachment
+    rows store absolute paths, so they are rewritten to point at the restored
+    uploads.  The live database and uploads are never touched.
+    """
+    problems = verify_snapshot(backup_dir, name)
+    if problems:
+        raise ValueError('snapshot failed verification: ' + '; '.join(problems))
+    if os.path.exists(target_dir) and os.listdir(target_dir):
+        raise ValueError(f'restore target {target_dir} is not empty')
+
+    snapshot_dir = os.path.join(backup_dir, name)
+    manifest = load_manifest(snapshot_dir)
+    target_db = os.path.join(target_dir, DB_FILENAME)
+    target_uploads = os.path.join(target_dir, 'uploads')
+    os.makedirs(target_uploads, exist_ok=True)
+
+    copy_database(os.path.join(snapshot_dir, manifest['database']['file']), target_db)
+    for rel, entry in manifest['files'].items():
+        dest = os.path.join(target_uploads, *rel.split('/'))
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        shutil.copyfile(_blob_path(backup_dir, entry['sha256']), dest)
+
+    old_prefix = manifest['uploads_dir'].rstrip(os.sep) + os.sep
+    new_prefix = target_uploads + os.sep
+    conn = sqlite3.connect(target_db)
+    try:
+        with conn:
+            conn.execute(
+                "UPDATE task_attachment SET file_path = :new || substr(file_path, length(:old) + 1) "
+                "WHERE substr(file_path, 1, length(:old)) = :old",
+                {'old': old_prefix, 'new': new_prefix},
+            )
+    except sqlite3.OperationalError:
+        pass  # snapshot predates the attachment table
+    finally:
+        conn.close()
+    return target_db
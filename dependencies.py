@@ -0,0 +1,81 @@
+"""In-memory task dependency graph.
+
+Edges point from a predecessor to the task that follows it and carry a lag
+in business days.  Every query here is a plain graph walk over adjacency
+dicts, so it is linear in the size of the part of the graph it touches.
+"""
+from collections import deque
+
+
+class DependencyGraph:
+    def __init__(self, edges=()):
+        # task id -> {predecessor id: lag}, and the reverse
+        self._preds = {}
+        self._succs = {}
+        for task_id, predecessor_id, lag in edges:
+            self.add_edge(task_id, predecessor_id, lag)
+
+    def add_edge(self, task_id, predecessor_id, lag=0):
+        self._preds.setdefault(task_id, {})[predecessor_id] = lag
+        self._succs.setdefault(predecessor_id, {})[task_id] = lag
+
+    def predecessors(self, task_id):
+        """{predecessor id: lag} of a task"""
+        return self._preds.get(task_id, {})
+
+    def successors(self, task_id):
+        """{successor id: lag} of a task"""
+        return self._succs.get(task_id, {})
+
+    def _reachable(self, start, adjacency):
+        seen = set()
+        queue = deque(adjacency.get(start, ()))
+        while queue:
+            node = queue.popleft()
+            if node in seen:
+                continue
+            seen.add(node)
+            queue.extend(adjacency.get(node, ()))
+        return seen
+
+    def ancestors(self, task_id):
+        """Every task this one waits on, directly or not"""
+        return self._reachable(task_id, self._preds)
+
+    def descendants(self, task_id):
+        """Every task that waits on this one, directly or not"""
+        return self._reachable(task_id, self._succs)
+
+    def would_create_cycle(self, task_id, predecessor_id):
+        """True if making predecessor_id a predecessor of task_id closes a
+        loop, i.e. the predecessor already (transitively) follows the task"""
+        if task_id == predecessor_id:
+            return True
+        # walk forward from the task; stop as soon as we meet the predecessor
+        seen = {task_id}
+        queue = deque([task_id])
+        while queue:
+            for successor in self._succs.get(queue.popleft(), ()):
+                if successor == predecessor_id:
+                    return True
+                if successor not in seen:
+                    seen.add(successor)
+                    queue.append(successor)
+        return False
+
+    def descendants_in_order(self, task_id):
+        """Descendants of a task, each listed after all of its predecessors
+        that are also descendants (Kahn's algorithm on the sub-graph)"""
+        nodes = self.descendants(task_id)
+        waiting = {n: sum(1 for p in self.predecessors(n) if p in nodes) for n in nodes}
+        queue = deque(sorted(n for n, count in waiting.items() if count == 0))
+        order = []
+        while queue:
+            node = queue.popleft()
+            order.append(node)
+            for successor in self.successors(node):
+                if successor in waiting:
+                    waiting[successor] -= 1
+                    if waiting[successor] == 0:
+                        queue.append(successor)
+        return order
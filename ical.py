@@ -0,0 +1,80 @@
+"""Minimal iCalendar (RFC 5545) writer for task schedules.
+
+Only what the task feeds need: all-day VEVENTs with text fields.  Output is
+produced as a stream of encoded chunks so a large calendar never has to be
+held in memory as one string while it is generated.
+"""
+from datetime import timedelta
+
+
+PRODID = '-//Project Tracker//Task Schedule//EN'
+
+
+def escape_text(value):
+    """Escape a TEXT value (backslash, semicolon, comma, newlines)"""
+    return (str(value or '')
+            .replace('\\', '\\\\')
+            .replace(';', '\\;')
+            .replace(',', '\\,')
+            .replace('\r\n', '\\n')
+            .replace('\n', '\\n'))
+
+
+def fold_line(line):
+    """Encode a content line, folded at 75 octets as the RFC requires"""
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return data + b'\r\n'
+    out = []
+    limit = 75
+    while data:
+        cut = min(limit, len(data))
+        # never split a multi-byte UTF-8 sequence
+        while cut < len(data) and (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        out.append(data[:cut])
+        data = data[cut:]
+        limit = 74  # continuation lines start with a space
+    return b'\r\n '.join(out) + b'\r\n'
+
+
+def _ics_date(d):
+    return d.strftime('%Y%m%d')
+
+
+def event_lines(uid, start, end, summary, description, stamp, categories=None):
+    """Lines of one all-day event; end is inclusive like Task.end_date"""
+    start = start or end
+    end = end or start
+    yield 'BEGIN:VEVENT'
+    yield f'UID:{uid}'
+    yield f"DTSTAMP:{stamp.strftime('%Y%m%dT%H%M%SZ')}"
+    yield f'DTSTART;VALUE=DATE:{_ics_date(start)}'
+    # DTEND is exclusive for all-day events
+    yield f'DTEND;VALUE=DATE:{_ics_date(max(end, start) + timedelta(days=1))}'
+    yield f'SUMMARY:{escape_text(summary)}'
+    if description:
+        yield f'DESCRIPTION:{escape_text(description)}'
+    if categories:
+        yield f'CATEGORIES:{escape_text(categories)}'
+    yield 'END:VEVENT'
+
+
+def calendar_chunks(name, events, batch=64):
+    """Yield the encoded calendar in chunks of ``batch`` events.
+
+    ``events`` is an iterable of iterables of lines (see event_lines), so
+    it can be a lazy database query.
+    """
+    head = ['BEGIN:VCALENDAR', 'VERSION:2.0', f'PRODID:{PRODID}', 'CALSCALE:GREGORIAN',
+            'METHOD:PUBLISH', f'X-WR-CALNAME:{escape_text(name)}']
+    yield b''.join(fold_line(line) for line in head)
+
+    buffer = []
+    for i, lines in enumerate(events, 1):
+        buffer.extend(fold_line(line) for line in lines)
+        if i % batch == 0:
+            yield b''.join(buffer)
+            buffer = []
+    buffer.append(fold_line('END:VCALENDAR'))
+    yield b''.join(buffer)
@@ -0,0 +1,372 @@
+"""Local load test for the project tracker.
+
+Starts the app on a scratch database (seeded with synthetic projects, or a
+copy of an existing tracker.db), runs N concurrent clients that replay a
+weighted mix of the app's real routes for a fixed time, and prints
+throughput, latency percentiles and error / "database is locked" rates per
+route.
+
+    python loadtest.py --clients 20 --duration 30
+    python loadtest.py --from-db tracker.db --mix project_detail=8,upload=1
+    python loadtest.py --url http://127.0.0.1:5000 --from-db tracker.db
+
+With ``--url`` the server is not started; ``--from-db`` must then be the
+database that server is using, since it is where request ids come from.
+Nothing here touches the live tracker.db or uploads/ unless ``--url``
+points at the live server.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+from urllib.parse import urlsplit
+
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+
+DEFAULT_MIX = {
+    'index': 1,
+    'project_detail': 4,
+    'task_patch': 2,
+    'todo_toggle': 3,
+    'upload': 1,
+    'materials': 2,
+    'variant_pick': 1,
+}
+
+
+# ------------------------------------------------------------------
+#   Scratch database
+# ------------------------------------------------------------------
+def seed_database(projects, tasks_per_project):
+    """Fill the database the app is configured with (TRACKER_DB_PATH)"""
+    from app import app, db, init_db, Project, Task, TaskDependency, Todo, Material, MaterialVariant
+
+    init_db()
+    with app.app_context():
+        for p in range(projects):
+            proj = Project(name=f'Load test project {p + 1}', stage='Construction')
+            db.session.add(proj)
+            start = date.today()
+            previous = None
+            for t in range(tasks_per_project):
+                end = start + timedelta(days=3)
+                task = Task(name=f'Task {t + 1}', category='General', vendor=f'Vendor {t % 5}',
+                            start_date=start, end_date=end, project=proj, dependency=previous)
+                db.session.add(task)
+                if previous is not None:
+                    # dependency_id is always backed by a task_dependency row
+                    db.session.add(TaskDependency(task=task, predecessor=previous))
+                for m in range(2):
+                    material = Material(name=f'Material {t + 1}.{m + 1}', project=proj, task=task)
+                    for v in range(3):
+                        material.variants.append(MaterialVariant(url='', note=f'Option {v + 1}',
+                                                                 cost=10.0 * (v + 1)))
+                    db.session.add(material)
+                # dependency chains of five tasks, like a real schedule
+                previous = task if t % 5 else None
+                start = end + timedelta(days=1)
+            for i in range(10):
+                db.session.add(Todo(text=f'Todo {i + 1}', project=proj))
+        db.session.commit()
+
+
+def load_ids(db_path):
+    """Ids the clients pick from, read straight from the database"""
+    conn = sqlite3.connect(db_path)
+    try:
+        def column(sql):
+            return [row[0] for row in conn.execute(sql)]
+        ids = {
+            'project': column('SELECT id FROM project'),
+            'task': conn.execute('SELECT id, project_id FROM task').fetchall(),
+            'todo': column('SELECT id FROM todo'),
+            'material': column('SELECT id FROM material'),
+            'variant': column('SELECT id FROM material_variant'),
+        }
+    finally:
+        conn.close()
+    if not ids['project'] or not ids['task']:
+        raise SystemExit('database has no projects/tasks to load test against')
+    return ids
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(env, port):
+    cmd = [sys.executable, '-m', 'flask', '--app', 'app', 'run', '--port', str(port),
+           '--with-threads', '--no-reload', '--no-debugger']
+    proc = subprocess.Popen(cmd, cwd=BASE_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit('server exited during startup')
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.2):
+                return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise SystemExit('server did not start within 15s')
+
+
+# ------------------------------------------------------------------
+#   Requests
+# ------------------------------------------------------------------
+def _multipart(filename, content, content_type):
+    boundary = uuid.uuid4().hex
+    body = (
+        f'--{boundary}\r\n'
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f'Content-Type: {content_type}\r\n\r\n'
+    ).encode() + content + f'\r\n--{boundary}--\r\n'.encode()
+    return body, f'multipart/form-data; boundary={boundary}'
+
+
+def build_request(route, ids, rng, upload_bytes):
+    """Return (method, path, body, headers) for one request of the given route"""
+    json_headers = {'Content-Type': 'application/json'}
+    if route == 'index':
+        return 'GET', '/', None, {}
+    if route == 'project_detail':
+        return 'GET', f'/project/{rng.choice(ids["project"])}', None, {}
+    if route == 'task_patch':
+        task_id, _ = rng.choice(ids['task'])
+        body = json.dumps({'notes': f'load test {rng.random():.6f}'}).encode()
+        return 'PATCH', f'/task/{task_id}', body, json_headers
+    if route == 'todo_toggle':
+        return 'PATCH', f'/todo/{rng.choice(ids["todo"])}/toggle', None, {}
+    if route == 'upload':
+        task_id, _ = rng.choice(ids['task'])
+        body, content_type = _multipart('photo.jpg', upload_bytes, 'image/jpeg')
+        return 'POST', f'/task/{task_id}/upload', body, {'Content-Type': content_type}
+    if route == 'materials':
+        return 'GET', f'/project/{rng.choice(ids["project"])}/materials', None, {}
+    if route == 'variant_pick':
+        body = json.dumps({'variant_id': rng.choice(ids['variant'])}).encode()
+        return 'POST', '/materials/variant/pick', body, json_headers
+    raise ValueError(f'unknown route {route!r}')
+
+
+# Routes that can't be exercised when the database has none of these rows
+ROUTE_NEEDS = {
+    'todo_toggle': 'todo',
+    'variant_pick': 'variant',
+}
+
+
+class RouteStats:
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.locked = 0
+
+    def merge(self, other):
+        self.latencies.extend(other.latencies)
+        self.errors += other.errors
+        self.locked += other.locked
+
+
+def client(host, port, mix, ids, deadline, seed, upload_bytes, results):
+    """One simulated user: fire requests back to back until the deadline"""
+    rng = random.Random(seed)
+    routes = list(mix)
+    weights = [mix[r] for r in routes]
+    stats = {route: RouteStats() for route in routes}
+
+    while time.time() < deadline:
+        route = rng.choices(routes, weights)[0]
+        method, path, body, headers = build_request(route, ids, rng, upload_bytes)
+        started = time.perf_counter()
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+            conn.request(method, path, body=body, headers=headers)
+            resp = conn.getresponse()
+            payload = resp.read()
+            conn.close()
+            status = resp.status
+            locked = resp.getheader('X-Database-Locked') == '1'
+        except (OSError, http.client.HTTPException) as e:
+            status, payload, locked = 0, str(e).encode(), False
+        elapsed = time.perf_counter() - started
+
+        s = stats[route]
+        s.latencies.append(elapsed)
+        if status == 0 or status >= 400:
+            s.errors += 1
+            # the app marks lock timeouts with a header; upload_file still
+            # reports them in its own JSON error body
+            if locked or b'database is locked' in payload:
+                s.locked += 1
+
+    results.append(stats)
+
+
+# ------------------------------------------------------------------
+#   Report
+# ------------------------------------------------------------------
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(stats, duration):
+    rows = []
+    total = RouteStats()
+    for route, s in sorted(stats.items()):
+        total.merge(s)
+        rows.append(_summary_row(route, s, duration))
+    rows.append(_summary_row('TOTAL', total, duration))
+    return rows
+
+
+def _summary_row(route, s, duration):
+    lat = sorted(s.latencies)
+    count = len(lat)
+    return {
+        'route': route,
+        'requests': count,
+        'rps': count / duration if duration else 0.0,
+        'p50_ms': percentile(lat, 50) * 1000,
+        'p95_ms': percentile(lat, 95) * 1000,
+        'p99_ms': percentile(lat, 99) * 1000,
+        'max_ms': (lat[-1] if lat else 0.0) * 1000,
+        'error_rate': s.errors / count if count else 0.0,
+        'lock_rate': s.locked / count if count else 0.0,
+    }
+
+
+def print_report(rows, clients, duration):
+    print(f'\n{clients} clients, {duration:.1f}s\n')
+    header = f'{"route":<18} {"reqs":>7} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"max ms":>8} {"err %":>6} {"lock %":>6}'
+    print(header)
+    print('-' * len(header))
+    for r in rows:
+        if r['route'] == 'TOTAL':
+            print('-' * len(header))
+        print(f'{r["route"]:<18} {r["requests"]:>7} {r["rps"]:>8.1f} {r["p50_ms"]:>8.1f} '
+              f'{r["p95_ms"]:>8.1f} {r["p99_ms"]:>8.1f} {r["max_ms"]:>8.1f} '
+              f'{r["error_rate"] * 100:>6.2f} {r["lock_rate"] * 100:>6.2f}')
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f'unknown route {name!r}; choose from {", ".join(DEFAULT_MIX)}')
+        try:
+            mix[name] = float(weight) if weight else 1.0
+        except ValueError:
+            raise argparse.ArgumentTypeError(f'bad weight for {name!r}: {weight!r}')
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test the project tracker.')
+    parser.add_argument('--clients', type=int, default=20, help='concurrent clients (default 20)')
+    parser.add_argument('--duration', type=float, default=30, help='seconds to run (default 30)')
+    parser.add_argument('--mix', type=parse_mix, default=dict(DEFAULT_MIX),
+                        help='route weights, e.g. project_detail=4,upload=1 (default: %s)'
+                             % ','.join(f'{k}={v}' for k, v in DEFAULT_MIX.items()))
+    parser.add_argument('--from-db', help='copy this database instead of seeding synthetic data')
+    parser.add_argument('--projects', type=int, default=5, help='synthetic projects to seed (default 5)')
+    parser.add_argument('--tasks', type=int, default=40, help='tasks per synthetic project (default 40)')
+    parser.add_argument('--upload-kb', type=int, default=200, help='size of each uploaded photo (default 200)')
+    parser.add_argument('--url', help='load test an already running server instead of starting one')
+    parser.add_argument('--seed', type=int, default=0, help='random seed for the request mix')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    parser.add_argument('--keep', action='store_true', help='keep the scratch database and uploads')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='tracker-loadtest-')
+    proc = None
+    try:
+        if args.url:
+            if not args.from_db:
+                parser.error('--url needs --from-db pointing at the server\'s database')
+            parts = urlsplit(args.url)
+            host, port = parts.hostname, parts.port or 80
+            db_path = args.from_db
+        else:
+            db_path = os.path.join(workdir, 'tracker.db')
+            env = dict(os.environ, TRACKER_DB_PATH=db_path,
+                       TRACKER_UPLOAD_DIR=os.path.join(workdir, 'uploads'))
+            if args.from_db:
+                import backup
+                backup.copy_database(args.from_db, db_path)
+            else:
+                # seed in this process with the same settings the server gets
+                os.environ.update(env)
+                seed_database(args.projects, args.tasks)
+            host, port = '127.0.0.1', _free_port()
+            proc = start_server(env, port)
+
+        ids = load_ids(db_path)
+        # one untimed page load so one-off startup work (asset bundles, first
+        # connections) doesn't end up in the percentiles
+        warmup = http.client.HTTPConnection(host, port, timeout=60)
+        warmup.request('GET', f'/project/{ids["project"][0]}')
+        warmup.getresponse().read()
+        warmup.close()
+        for route, kind in ROUTE_NEEDS.items():
+            if route in args.mix and not ids[kind]:
+                print(f'skipping {route}: no {kind} rows in the database', file=sys.stderr)
+                del args.mix[route]
+        upload_bytes = os.urandom(args.upload_kb * 1024)
+        results = []
+        deadline = time.time() + args.duration
+        started = time.time()
+        threads = [
+            threading.Thread(target=client, args=(host, port, args.mix, ids, deadline,
+                                                  args.seed + i, upload_bytes, results))
+            for i in range(args.clients)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.time() - started
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait()
+        if args.keep:
+            print(f'Scratch data kept in {workdir}', file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    stats = {route: RouteStats() for route in args.mix}
+    for client_stats in results:
+        for route, s in client_stats.items():
+            stats[route].merge(s)
+
+    rows = summarize(stats, elapsed)
+    if args.json:
+        print(json.dumps({'clients': args.clients, 'duration': elapsed, 'routes': rows}, indent=2))
+    else:
+        print_report(rows, args.clients, elapsed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Sampling profiler for single requests.
+
+A background thread looks at the profiled thread's stack every few
+milliseconds and counts how often each call stack is seen.  The result is
+written in the "folded" format used by flamegraph.pl, speedscope and
+friends (one ``frame;frame;frame count`` line per distinct stack), next to a
+JSON file with the request's details and the SQL it issued.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+
+DEFAULT_INTERVAL = 0.005
+# Older profiles are deleted once there are more than this many
+KEEP_PROFILES = 200
+
+
+def _frame_label(code):
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+class RequestProfile:
+    """Samples one thread's stack and records the SQL it runs"""
+
+    def __init__(self, thread_id, interval=DEFAULT_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.queries = []
+        self.started_at = None
+        self.duration = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+
+    @property
+    def running(self):
+        return self.duration is None
+
+    def record_query(self, statement, duration):
+        self.queries.append({'statement': statement, 'duration_ms': round(duration * 1000, 3)})
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def folded(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+    def save(self, profile_dir, name, method, path, endpoint, status):
+        """Write <name>.folded and <name>.json"""
+        os.makedirs(profile_dir, exist_ok=True)
+        with open(os.path.join(profile_dir, name + '.folded'), 'w') as fh:
+            fh.write(self.folded())
+        meta = {
+            'name': name,
+            'method': method,
+            'path': path,
+            'endpoint': endpoint,
+            'status': status,
+            'created_at': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+            'duration_ms': round(self.duration * 1000, 3),
+            'interval_ms': self.interval * 1000,
+            'samples': sum(self.stacks.values()),
+            'sql_ms': round(sum(q['duration_ms'] for q in self.queries), 3),
+            'queries': self.queries,
+        }
+        with open(os.path.join(profile_dir, name + '.json'), 'w') as fh:
+            json.dump(meta, fh, indent=2)
+        prune(profile_dir)
+
+
+def new_name(endpoint):
+    """Sortable, unique-enough name for a profile taken now"""
+    return f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}-{endpoint or 'unknown'}"
+
+
+def list_profiles(profile_dir):
+    """Metadata of saved profiles, newest first"""
+    if not os.path.isdir(profile_dir):
+        return []
+    profiles = []
+    for filename in sorted(os.listdir(profile_dir), reverse=True):
+        if not filename.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(profile_dir, filename)) as fh:
+                profiles.append(json.load(fh))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+
+def prune(profile_dir, keep=KEEP_PROFILES):
+    names = sorted(f[:-len('.json')] for f in os.listdir(profile_dir) if f.endswith('.json'))
+    for name in names[:-keep]:
+        for ext in ('.json', '.folded'):
+            try:
+                os.remove(os.path.join(profile_dir, name + ext))
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,63 @@
+// Dependency management and date adjustment logic
+document.addEventListener('DOMContentLoaded', function() {
+    // Function to adjust dates when dependency changes
+    function adjustDatesForDependency(startDateInput, endDateInput, dependencySelect) {
+        const selectedDependencyId = dependencySelect.value;
+        if (!selectedDependencyId) return;
+
+        // Find the dependency task
+        const dependencyTask = PAGE.tasks.find(t => t.id == selectedDependencyId);
+        if (!dependencyTask || !dependencyTask.end_date) return;
+
+        const dependencyEndDate = new Date(dependencyTask.end_date);
+        const minStartDate = new Date(dependencyEndDate);
+        minStartDate.setDate(minStartDate.getDate() + 1);
+
+        // Adjust to next weekday if it falls on weekend
+        while (minStartDate.getDay() === 0 || minStartDate.getDay() === 6) {
+            minStartDate.setDate(minStartDate.getDate() + 1);
+        }
+
+        // Update start date if it's before the minimum
+        if (startDateInput.value && new Date(startDateInput.value) < minStartDate) {
+            startDateInput.value = minStartDate.toISOString().split('T')[0];
+        }
+
+        // If end date is set, maintain the same duration
+        if (startDateInput.value && endDateInput.value) {
+            const startDate = new Date(startDateInput.value);
+            const endDate = new Date(endDateInput.value);
+            const duration = Math.ceil((endDate - startDate) / (1000 * 60 * 60 * 24));
+
+            let newEndDate = new Date(startDateInput.value);
+            let businessDaysAdded = 0;
+
+            while (businessDaysAdded < duration) {
+                newEndDate.setDate(newEndDate.getDate() + 1);
+                if (newEndDate.getDay() !== 0 && newEndDate.getDay() !== 6) {
+                    businessDaysAdded++;
+                }
+            }
+
+            // Adjust to next weekday if it falls on weekend
+            while (newEndDate.getDay() === 0 || newEndDate.getDay() === 6) {
+                newEndDate.setDate(newEndDate.getDate() + 1);
+            }
+
+            endDateInput.value = newEndDate.toISOString().split('T')[0];
+        }
+    }
+
+    // Add event listeners for dependency changes
+    document.addEventListener('change', function(e) {
+        if (e.target.name === 'dependency_id' || e.target.classList.contains('dependency-select')) {
+            const row = e.target.closest('tr');
+            const startDateInput = row.querySelector('input[type="date"]:first-of-type');
+            const endDateInput = row.querySelector('input[type="date"]:last-of-type');
+
+            if (startDateInput && endDateInput) {
+                adjustDatesForDependency(startDateInput, endDateInput, e.target);
+            }
+        }
+    });
+});
@@ -0,0 +1,395 @@
+document.addEventListener("DOMContentLoaded", function () {
+    const decisionContent = document.getElementById("decision-content");
+
+    // Desktop and mobile show the same data; each view is a task selector,
+    // a list and an "add material" input.
+    const views = [
+        {suffix: ""},
+        {suffix: "-mobile"},
+    ].map(v => ({
+        ...v,
+        selector: document.getElementById(`taskSelector${v.suffix}`),
+        list: document.getElementById(`materialList${v.suffix}`),
+        input: document.getElementById(`newMaterialInput${v.suffix}`),
+        addBtn: document.getElementById(`addMaterialBtn${v.suffix}`),
+    })).filter(v => v.selector && v.list);
+
+    // The whole project's materials, fetched once:
+    // groups: task id (or "general") -> [material]; byId: material id -> material
+    let groups = {};
+    const byId = new Map();
+    let openMaterialId = null;
+
+    const escapeHtml = s => String(s ?? "").replace(/[&<>"']/g, c => ({
+        "&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;"
+    }[c]));
+
+    function loadMaterials() {
+        return fetch(`/project/${PAGE.projectId}/materials`)
+            .then(res => res.json())
+            .then(data => {
+                groups = data.groups;
+                byId.clear();
+                Object.values(groups).forEach(list => list.forEach(m => byId.set(m.id, m)));
+                renderLists();
+            });
+    }
+
+    function groupKey(material) {
+        return material.task_id ? String(material.task_id) : "general";
+    }
+
+    function materialItem(material) {
+        const hasPicked = material.variants.some(v => v.picked);
+        const li = document.createElement("li");
+        li.className = "list-group-item d-flex justify-content-between align-items-center";
+        li.dataset.id = material.id;
+        li.innerHTML = `
+            <div class="d-flex align-items-center justify-content-between w-100">
+             <!-- Left: Material Name -->
+             <div class="flex-grow-1">
+               <span class="material-name ${material.ordered ? 'text-decoration-line-through text-muted' : ''}" style="cursor:pointer;">
+                 ${escapeHtml(material.name)}
+               </span>
+             </div>
+
+             <!-- Right: Choose Button + Ordered Checkbox -->
+             <div class="d-flex align-items-center ms-3">
+               <a href="#" class="btn btn-sm btn-outline-secondary me-3 decision-btn"
+                  data-bs-toggle="modal"
+                  data-bs-target="#decisionModal"
+                  data-id="${material.id}">
+                 Choose ${hasPicked ? '<i class="bi bi-check-circle-fill text-success ms-1"></i>' : ''}
+               </a>
+               <div class="d-flex flex-column align-items-center">
+                 <input type="checkbox" class="form-check-input ordered-check"
+                        style="transform: scale(1.6);" ${material.ordered ? 'checked' : ''}>
+               </div>
+             </div>
+           </div>
+         `;
+        return li;
+    }
+
+    function renderLists() {
+        views.forEach(view => {
+            view.list.innerHTML = "";
+            (groups[view.selector.value] || []).forEach(material => {
+                view.list.appendChild(materialItem(material));
+            });
+        });
+    }
+
+    function variantItem(option) {
+        const label = option.url && option.url.trim()
+            ? `<a href="${escapeHtml(option.url)}" target="_blank">${escapeHtml(option.note || option.url)}</a>`
+            : `<span>${escapeHtml(option.note || "No description")}</span>`;
+        const cost = option.cost
+            ? `<span class="badge bg-success">$${Number(option.cost).toFixed(2)}</span>`
+            : "";
+        return `
+            <li class="list-group-item d-flex justify-content-between align-items-center" data-id="${option.id}">
+                <!-- Left: Text + Cost -->
+                <div class="d-flex align-items-center gap-3">${label}${cost}</div>
+
+                <!-- Right: Delete + Radio -->
+                <div class="d-flex align-items-center gap-2">
+                    <button type="button" class="btn btn-sm btn-outline-danger delete-variant" title="Delete Variant">
+                        <i class="bi bi-trash"></i>
+                    </button>
+                    <input type="radio" name="picked_variant" value="${option.id}" ${option.picked ? 'checked' : ''}>
+                </div>
+            </li>`;
+    }
+
+    function renderVariants(material) {
+        const list = document.getElementById("variant-list");
+        if (list && material.id === openMaterialId) {
+            list.innerHTML = material.variants.map(variantItem).join("");
+        }
+    }
+
+    function renderDecision(material) {
+        decisionContent.innerHTML = `
+            <form id="decision-form">
+                <div class="mb-3">
+                    <!-- List of Existing Variants -->
+                    <ul class="list-group mb-3" id="variant-list"></ul>
+
+                    <!-- Toggle Button to Show Add Form -->
+                    <button type="button" class="btn btn-outline-primary mb-2" id="showAddVariantForm">Add Variant</button>
+
+                    <!-- Hidden Add Variant Form -->
+                    <div id="addVariantForm" class="d-none">
+                        <div class="d-flex gap-2 mb-2">
+                            <input type="text" name="url" class="form-control" placeholder="Variant link (optional)">
+                            <input type="text" name="note" class="form-control" placeholder="Note (optional)">
+                            <input type="number" name="cost" class="form-control" placeholder="Cost ($)" step="0.01" min="0">
+                            <button type="submit" class="btn btn-success">Save</button>
+                        </div>
+                        <input type="hidden" name="material_id" value="${material.id}">
+                    </div>
+                </div>
+            </form>`;
+        renderVariants(material);
+    }
+
+    function removeMaterial(id) {
+        const material = byId.get(Number(id));
+        if (!material) return;
+        byId.delete(material.id);
+        const list = groups[groupKey(material)] || [];
+        list.splice(list.indexOf(material), 1);
+        renderLists();
+    }
+
+    views.forEach(view => {
+        view.selector.addEventListener("change", renderLists);
+
+        if (!view.addBtn || !view.input) return;
+        view.addBtn.addEventListener("click", () => {
+            const name = view.input.value.trim();
+            if (!name) return;
+
+            fetch(`/materials/add`, {
+                method: 'POST',
+                headers: {'Content-Type': 'application/json'},
+                body: JSON.stringify({
+                    name,
+                    task_id: view.selector.value === 'general' ? null : view.selector.value,
+                    project_id: PAGE.projectId
+                })
+            })
+            .then(res => res.json())
+            .then(data => {
+                view.input.value = '';
+                const material = data.material;
+                byId.set(material.id, material);
+                (groups[groupKey(material)] ||= []).push(material);
+                renderLists();
+            });
+        });
+    });
+
+    // Open decision modal - everything it shows is already loaded
+    document.body.addEventListener("click", function (e) {
+        const btn = e.target.closest(".decision-btn");
+        if (!btn) return;
+        const material = byId.get(Number(btn.dataset.id));
+        if (!material) return;
+
+        openMaterialId = material.id;
+        renderDecision(material);
+        document.getElementById("decisionModalTitle").textContent = `${material.name} Choices`;
+        document.getElementById("deleteMaterialBtn").dataset.id = material.id;
+        document.getElementById("deselect-variant").dataset.materialId = material.id;
+    });
+
+    // Toggle show/hide of the add variant form
+    document.body.addEventListener("click", function (e) {
+        if (e.target.id === "showAddVariantForm") {
+            const form = document.getElementById("addVariantForm");
+            form.classList.toggle("d-none");
+        }
+    });
+
+    // Handle adding a new variant
+    document.body.addEventListener("submit", function (e) {
+        if (e.target.id === "decision-form") {
+            e.preventDefault();
+
+            const form = e.target;
+            let url = form.querySelector("input[name='url']").value.trim();
+            const note = form.querySelector("input[name='note']").value.trim();
+            const cost = form.querySelector("input[name='cost']").value.trim();
+            const materialId = form.querySelector("input[name='material_id']").value;
+
+            // Validate URL only if provided and not empty
+            if (url && url.trim()) {
+                // Prepend http:// if missing
+                if (!/^https?:\/\//i.test(url)) {
+                    url = 'http://' + url;
+                }
+
+                // Validate using URL + check for at least one dot in hostname
+                let parsed;
+                try {
+                    parsed = new URL(url);
+                } catch {
+                    alert("Please enter a valid URL (e.g. https://example.com)");
+                    return;
+                }
+
+                if (!parsed.hostname.includes(".")) {
+                    alert("That doesn't look like a valid domain. Please enter something like example.com");
+                    return;
+                }
+            }
+
+            fetch(`/materials/variant/add`, {
+                method: "POST",
+                headers: { "Content-Type": "application/json" },
+                body: JSON.stringify({ url, note, cost, material_id: materialId })
+            })
+            .then(res => res.json())
+            .then(data => {
+                const material = byId.get(data.material_id);
+                if (material) {
+                    material.variants.push(data.variant);
+                    renderVariants(material);
+                }
+                form.reset();
+                document.getElementById("addVariantForm").classList.add("d-none");
+            });
+        }
+    });
+
+    // When a picked_variant radio is changed, send the update to the server
+    document.body.addEventListener("change", function (e) {
+        if (e.target.name === "picked_variant") {
+            const pickedId = e.target.value;
+
+            fetch("/materials/variant/pick", {
+                method: "POST",
+                headers: { "Content-Type": "application/json" },
+                body: JSON.stringify({ variant_id: pickedId })
+            })
+            .then(res => res.json())
+            .then(data => {
+                const material = byId.get(data.material_id);
+                if (!material) return;
+                material.variants.forEach(v => { v.picked = v.id === data.picked_id; });
+                // update the checkmark
+                renderLists();
+            });
+        }
+    });
+
+    // Handle deselect button click
+    document.body.addEventListener("click", function (e) {
+        if (e.target.id === "deselect-variant") {
+            const materialId = e.target.dataset.materialId;
+
+            fetch("/materials/variant/unpick", {
+                method: "POST",
+                headers: { "Content-Type": "application/json" },
+                body: JSON.stringify({ material_id: materialId })
+            })
+            .then(() => {
+                const material = byId.get(Number(materialId));
+                if (!material) return;
+                material.variants.forEach(v => { v.picked = false; });
+                renderVariants(material);
+                renderLists();
+            });
+        }
+    });
+
+    // Handle "ordered" checkbox toggle
+    document.body.addEventListener("change", function (e) {
+        if (e.target.classList.contains("ordered-check")) {
+            const li = e.target.closest("li");
+            const nameSpan = li.querySelector(".material-name");
+            const isChecked = e.target.checked;
+
+            if (isChecked) {
+                nameSpan.classList.add("text-decoration-line-through", "text-muted");
+            } else {
+                nameSpan.classList.remove("text-decoration-line-through", "text-muted");
+            }
+
+            const materialId = li.dataset.id;
+            const material = byId.get(Number(materialId));
+            if (material) material.ordered = isChecked;
+            fetch(`/materials/ordered/${materialId}`, {
+                method: "POST",
+                headers: {"Content-Type": "application/json"},
+                body: JSON.stringify({ ordered: isChecked })
+            });
+        }
+    });
+
+    document.body.addEventListener("click", function (e) {
+        const btn = e.target.closest("#deleteMaterialBtn");
+        if (btn) {
+            const id = btn.dataset.id;
+            if (confirm("Delete this material and all its variants?")) {
+                fetch(`/materials/delete/${id}`, { method: "POST" })
+                    .then(() => {
+                        // Close modal
+                        const modalEl = document.getElementById("decisionModal");
+                        const modal = bootstrap.Modal.getInstance(modalEl);
+                        modal.hide();
+
+                        removeMaterial(id);
+                    });
+            }
+        }
+    });
+
+    // Edit or delete material name on click
+    document.body.addEventListener("click", function (e) {
+        if (e.target.classList.contains("material-name")) {
+            const li = e.target.closest("li");
+            const id = li.dataset.id;
+            const currentName = e.target.textContent.trim();
+            const newName = prompt("Edit or delete material:", currentName);
+
+            if (newName === null) return;
+            if (newName === "") {
+                // Delete
+                fetch(`/materials/delete/${id}`, { method: "POST" })
+                    .then(() => removeMaterial(id));
+            } else {
+                // Update
+                fetch(`/materials/update/${id}`, {
+                    method: "POST",
+                    headers: {"Content-Type": "application/json"},
+                    body: JSON.stringify({ name: newName })
+                }).then(() => {
+                    const material = byId.get(Number(id));
+                    if (material) material.name = newName;
+                    renderLists();
+                });
+            }
+        }
+    });
+
+    // Handle deleting a variant
+    document.body.addEventListener("click", function (e) {
+        const btn = e.target.closest(".delete-variant");
+        if (!btn) return;
+
+        // Prevent event bubbling
+        e.preventDefault();
+        e.stopPropagation();
+
+        const variantId = Number(btn.closest("li").dataset.id);
+
+        if (confirm("Delete this variant?")) {
+            fetch(`/materials/variant/delete/${variantId}`, {
+                method: "POST"
+            })
+            .then(res => {
+                if (res.ok) {
+                    return res.json();
+                } else {
+                    throw new Error('Delete failed');
+                }
+            })
+            .then(data => {
+                const material = byId.get(data.material_id);
+                if (!material) return;
+                material.variants = material.variants.filter(v => v.id !== data.deleted_id);
+                renderVariants(material);
+                renderLists();
+            })
+            .catch(error => {
+                console.error('Error deleting variant:', error);
+                alert('Failed to delete variant');
+            });
+        }
+    });
+
+    loadMaterials(); // initial load
+});
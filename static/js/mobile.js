@@ -0,0 +1,58 @@
+// Mobile-specific todo functionality (materials.js drives both materials lists)
+document.addEventListener('DOMContentLoaded', function() {
+    // Mobile todo functionality
+    const todoInputMobile = document.getElementById('todo-input-mobile');
+    const todoAddMobile = document.getElementById('todo-add-mobile');
+    const todoListMobile = document.getElementById('todo-list-mobile');
+
+    if (todoAddMobile && todoInputMobile) {
+        // Add todo
+        async function addTodoMobile() {
+            const text = todoInputMobile.value.trim();
+            if (!text) return;
+            const r = await fetch(`/project/${PAGE.projectId}/todo`, {
+                method: 'POST',
+                headers: {'Content-Type': 'application/json'},
+                body: JSON.stringify({text})
+            });
+            if (r.ok) {
+                const todo = await r.json();
+                const li = document.createElement('li');
+                li.className = 'list-group-item d-flex align-items-center';
+                li.dataset.id = todo.id;
+                li.innerHTML = `
+                   <input class="form-check-input me-2 todo-check-mobile" type="checkbox">
+                   <span class="flex-grow-1">${todo.text}</span>
+                   <button class="btn btn-sm btn-outline-danger todo-del-mobile">&times;</button>`;
+                todoListMobile.append(li);
+                todoInputMobile.value = '';
+                todoInputMobile.focus();
+            }
+        }
+        todoAddMobile.onclick = addTodoMobile;
+        todoInputMobile.addEventListener('keypress', e => { if (e.key === 'Enter') addTodoMobile(); });
+
+        // Delegate toggle / delete for mobile
+        todoListMobile.addEventListener('click', async e => {
+            const li = e.target.closest('li');
+            if (!li) return;
+            const id = li.dataset.id;
+
+            // Toggle completed
+            if (e.target.classList.contains('todo-check-mobile')) {
+                const res = await fetch(`/todo/${id}/toggle`, {method: 'PATCH'});
+                if (res.ok) {
+                    const {completed} = await res.json();
+                    const span = li.querySelector('span');
+                    span.classList.toggle('text-decoration-line-through', completed);
+                    span.classList.toggle('text-muted', completed);
+                }
+            }
+            // Delete
+            if (e.target.classList.contains('todo-del-mobile')) {
+                const res = await fetch(`/todo/${id}`, {method: 'DELETE'});
+                if (res.ok) li.remove();
+            }
+        });
+    }
+});
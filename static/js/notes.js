@@ -0,0 +1,141 @@
+document.addEventListener('DOMContentLoaded', () => {
+    // Bootstrap has finished loading at this point
+    const modalEl = document.getElementById('noteModal');
+    const bsModal = new bootstrap.Modal(modalEl);
+    const textarea = document.getElementById('note-text');
+    const fileUpload = document.getElementById('file-upload');
+    const uploadBtn = document.getElementById('upload-btn');
+    const attachmentsList = document.getElementById('attachments-list');
+    let currentId = null;
+
+    // Open modal (event delegation so it works for new rows too)
+    document.addEventListener('click', e => {
+        const icon = e.target.closest('.note-icon');
+        if (!icon) return;
+
+        currentId = icon.dataset.id;
+        textarea.value = icon.dataset.notes;
+        loadAttachments(currentId);
+        bsModal.show();
+    });
+
+    // Load attachments for a task
+    async function loadAttachments(taskId) {
+        try {
+            const response = await fetch(`/task/${taskId}/attachments`);
+            if (response.ok) {
+                const data = await response.json();
+                displayAttachments(data.attachments);
+            }
+        } catch (error) {
+            console.error('Error loading attachments:', error);
+        }
+    }
+
+    // Display attachments in the list
+    function displayAttachments(attachments) {
+        attachmentsList.innerHTML = '';
+        if (attachments.length === 0) {
+            attachmentsList.innerHTML = '<p class="text-muted small">No files attached</p>';
+            return;
+        }
+
+        attachments.forEach(attachment => {
+            const attachmentDiv = document.createElement('div');
+            attachmentDiv.className = 'attachment-item border rounded p-2 mb-2';
+            attachmentDiv.innerHTML = `
+                <div class="d-flex justify-content-between align-items-center">
+                    <div class="flex-grow-1">
+                        <div class="fw-bold small">${attachment.filename}</div>
+                        <div class="text-muted small">${attachment.file_size} bytes • ${attachment.uploaded_at}</div>
+                    </div>
+                    <div class="btn-group btn-group-sm">
+                        <a href="/attachment/${attachment.id}/download" class="btn btn-outline-primary btn-sm">📥</a>
+                        <button class="btn btn-outline-danger btn-sm delete-attachment" data-id="${attachment.id}">🗑️</button>
+                    </div>
+                </div>
+            `;
+            attachmentsList.appendChild(attachmentDiv);
+        });
+    }
+
+    // Handle file uploads
+    uploadBtn.addEventListener('click', async () => {
+        const files = fileUpload.files;
+        if (files.length === 0) {
+            alert('Please select files to upload');
+            return;
+        }
+
+        for (const file of files) {
+            const formData = new FormData();
+            formData.append('file', file);
+
+            try {
+                const response = await fetch(`/task/${currentId}/upload`, {
+                    method: 'POST',
+                    body: formData
+                });
+
+                if (response.ok) {
+                    // Reload attachments
+                    loadAttachments(currentId);
+                    // Clear file input
+                    fileUpload.value = '';
+                } else {
+                    // Try to get error details, but handle non-JSON responses
+                    let errorMessage = 'Upload failed';
+                    try {
+                        const errorData = await response.json();
+                        errorMessage = errorData.error || 'Upload failed';
+                    } catch (jsonError) {
+                        // If response isn't JSON, get the text
+                        const responseText = await response.text();
+                        console.error('Non-JSON response:', responseText);
+                        errorMessage = `Upload failed (HTTP ${response.status})`;
+                    }
+                    alert(errorMessage);
+                }
+            } catch (error) {
+                console.error('Upload error:', error);
+                alert(`Upload failed: ${error.message}`);
+            }
+        }
+    });
+
+    // Handle attachment deletion
+    attachmentsList.addEventListener('click', async (e) => {
+        if (e.target.classList.contains('delete-attachment')) {
+            const attachmentId = e.target.dataset.id;
+            if (confirm('Delete this file?')) {
+                try {
+                    const response = await fetch(`/attachment/${attachmentId}`, {
+                        method: 'DELETE'
+                    });
+                    if (response.ok) {
+                        loadAttachments(currentId);
+                    } else {
+                        alert('Failed to delete file');
+                    }
+                } catch (error) {
+                    alert(`Delete failed: ${error.message}`);
+                }
+            }
+        }
+    });
+
+    // Save
+    document.getElementById('note-save').addEventListener('click', async () => {
+        const res = await fetch(`/task/${currentId}`, {
+            method: 'PATCH',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ notes: textarea.value })
+        });
+        if (!res.ok) { alert('Error saving notes'); return; }
+
+        // keep the icon's data-notes up-to-date
+        document.querySelector(`.note-icon[data-id="${currentId}"]`)
+                .dataset.notes = textarea.value;
+        bsModal.hide();
+    });
+});
@@ -0,0 +1,3 @@
+// Server-side data for the project page, rendered into #page-data by
+// project_detail.html so the scripts themselves can be cached.
+const PAGE = JSON.parse(document.getElementById('page-data').textContent);
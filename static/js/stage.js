@@ -0,0 +1,85 @@
+(() => {
+    const projId = PAGE.projectId;
+    const bar = document.getElementById('stage-bar');
+    const badge = document.querySelector('h2 .badge');
+    const mobileSelect = document.getElementById('stage-select');
+
+    const colour = stage => ({
+        'Planning':'danger', 'Pre-Construction':'warning',
+        'Construction':'info','Finish Work':'primary','Complete':'success'
+    }[stage]);
+
+    // Function to update the mobile dropdown
+    function updateMobileDropdown() {
+        const selectedStage = mobileSelect.value;
+        mobileSelect.querySelectorAll('option').forEach(opt => {
+            opt.selected = opt.value === selectedStage;
+        });
+    }
+
+    // Initial update
+    updateMobileDropdown();
+
+    // Add event listener for mobile dropdown change
+    mobileSelect.addEventListener('change', async (e) => {
+        const newStage = e.target.value;
+
+        // PATCH to server
+        const r = await fetch(`/project/${projId}/stage`, {
+            method:'PATCH',
+            headers:{'Content-Type':'application/json'},
+            body:JSON.stringify({stage:newStage})
+        });
+        if (!r.ok) return alert('Error updating stage');
+
+        // Update bar buttons
+        bar.querySelectorAll('.stage-btn').forEach(b => {
+            const active = b.dataset.stage === newStage;
+            b.className = 'btn btn-sm me-2 stage-btn ' +
+                (active ? 'btn btn-' + colour(newStage) : 'btn-outline-secondary');
+        });
+
+        // Update badge if it exists
+        if (badge) {
+            badge.textContent = newStage;
+            badge.className = 'badge bg-' + colour(newStage);
+        }
+    });
+
+    // Update badge
+    if (badge) {
+        badge.textContent = PAGE.stage;
+        badge.className = 'badge bg-' + colour(PAGE.stage);
+    }
+
+    // Update mobile dropdown based on bar buttons
+    bar.addEventListener('click', async e => {
+        const btn = e.target.closest('.stage-btn');
+        if (!btn) return;
+        const newStage = btn.dataset.stage;
+
+        // PATCH to server
+        const r = await fetch(`/project/${projId}/stage`, {
+            method:'PATCH',
+            headers:{'Content-Type':'application/json'},
+            body:JSON.stringify({stage:newStage})
+        });
+        if (!r.ok) return alert('Error updating stage');
+
+        // Update all button states
+        bar.querySelectorAll('.stage-btn').forEach(b => {
+            const active = b.dataset.stage === newStage;
+            b.className = 'btn btn-sm me-2 stage-btn ' +
+                (active ? 'btn btn-' + colour(newStage) : 'btn-outline-secondary');
+        });
+
+        // update badge
+        if (badge) {
+            badge.textContent = newStage;
+            badge.className = 'badge bg-' + colour(newStage);
+        }
+
+        // update mobile dropdown
+        mobileSelect.value = newStage;
+    });
+})();
@@ -0,0 +1,343 @@
+(() => {
+    const categories = ['Electrical','Plumbing','Construction','HVAC', 'Logistical', 'Finish Work'];
+    const statuses = ['Not Started','In Progress','Complete'];
+
+    // helper to build a <select>
+    function makeSelect(list, value) {
+        const s = document.createElement('select');
+        s.className = 'form-select form-select-sm';
+        list.forEach(opt => {
+            const o = document.createElement('option');
+            o.value = o.textContent = opt;
+            if (opt === value) o.selected = true;
+            s.append(o);
+        });
+        return s;
+    }
+
+    // helper to build a dependency select
+    function makeDependencySelect(tasks, currentDependencyId, currentTaskId) {
+        const s = document.createElement('select');
+        s.className = 'form-select form-select-sm';
+
+        // Add "None" option
+        const noneOption = document.createElement('option');
+        noneOption.value = '';
+        noneOption.textContent = 'None';
+        if (!currentDependencyId) noneOption.selected = true;
+        s.append(noneOption);
+
+        // Add task options (excluding current task)
+        tasks.forEach(task => {
+            if (task.id != currentTaskId) {
+                const o = document.createElement('option');
+                o.value = task.id;
+                o.textContent = task.name;
+                if (task.id == currentDependencyId) o.selected = true;
+                s.append(o);
+            }
+        });
+        return s;
+    }
+
+    const escapeHtml = s => String(s ?? "").replace(/[&<>"']/g, c => ({
+        "&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;"
+    })[c]);
+
+    const taskName = id => {
+        const task = PAGE.tasks.find(t => t.id == id);
+        return task ? task.name : 'Unknown';
+    };
+
+    // Follows cell in display mode, same markup as project_detail.html
+    function dependencyBadges(primaryId, predecessors) {
+        const lagText = lag => lag ? ` +${lag}d` : '';
+        const badges = [];
+        if (primaryId) {
+            const primary = predecessors.find(p => p.id == primaryId);
+            badges.push(`<span class="badge bg-info" data-dependency-id="${primaryId}">${escapeHtml(taskName(primaryId))}${lagText(primary && primary.lag_days)}</span>`);
+        }
+        predecessors.filter(p => p.id != primaryId).forEach(p => {
+            badges.push(`<span class="badge bg-light text-dark border extra-dependency" data-dependency-id="${p.id}">${escapeHtml(taskName(p.id))}${lagText(p.lag_days)}</span>`);
+        });
+        return badges.length ? badges.join(' ') : '<span class="text-muted">None</span>';
+    }
+
+    // show new dates of tasks the server moved after a dependency change
+    function applyDependentUpdates(updatedTasks) {
+        (updatedTasks || []).forEach(dependentTask => {
+            const dependentRow = document.querySelector(`tr[data-id="${dependentTask.id}"]`);
+            if (dependentRow) {
+                const dependentCells = dependentRow.children;
+
+                // Update start date
+                if (dependentTask.start_date) {
+                    dependentCells[3].textContent = dependentTask.start_date;
+                }
+
+                // Update end date
+                if (dependentTask.end_date) {
+                    dependentCells[4].textContent = dependentTask.end_date;
+
+                    // Update overdue styling
+                    const today = new Date().toISOString().split('T')[0];
+                    if (dependentTask.end_date < today) {
+                        dependentCells[4].className = 'text-danger fw-bold';
+                    } else {
+                        dependentCells[4].className = '';
+                    }
+                }
+
+                // Update the tasks_json array
+                const depTaskIndex = PAGE.tasks.findIndex(t => t.id == dependentTask.id);
+                if (depTaskIndex !== -1) {
+                    PAGE.tasks[depTaskIndex].start_date = dependentTask.start_date;
+                    PAGE.tasks[depTaskIndex].end_date = dependentTask.end_date;
+                }
+            }
+        });
+    }
+
+    // Every predecessor of a task with its lag (business days), plus a row
+    // to add another. Changes are saved straight away; `onMoved` gets the
+    // server's response when that moved the task.
+    function makePredecessorEditor(taskId, dependencySelect, onMoved) {
+        const box = document.createElement('div');
+        box.className = 'predecessor-editor mt-1';
+        const list = document.createElement('div');
+
+        const addRow = document.createElement('div');
+        addRow.className = 'input-group input-group-sm mt-1';
+        const addSelect = makeDependencySelect(PAGE.tasks, null, taskId);
+        addSelect.options[0].textContent = 'Add predecessor…';
+        const addLag = document.createElement('input');
+        addLag.type = 'number';
+        addLag.min = 0;
+        addLag.value = 0;
+        addLag.title = 'Lag in business days';
+        addLag.className = 'form-control';
+        addLag.style.maxWidth = '4.5em';
+        const addBtn = document.createElement('button');
+        addBtn.type = 'button';
+        addBtn.className = 'btn btn-outline-primary';
+        addBtn.textContent = 'Add';
+        addRow.append(addSelect, addLag, addBtn);
+        box.append(list, addRow);
+
+        async function send(method, url, body) {
+            const res = await fetch(url, {
+                method,
+                headers: {'Content-Type': 'application/json'},
+                body: body ? JSON.stringify(body) : undefined
+            });
+            const data = await res.json();
+            if (!res.ok) {
+                alert('Error updating dependencies: ' + (data.error || 'Unknown error'));
+                return null;
+            }
+            return data;
+        }
+
+        async function setLink(predecessorId, lagDays) {
+            const data = await send('POST', `/task/${taskId}/dependencies`,
+                                    {predecessor_id: predecessorId, lag_days: lagDays});
+            if (data) onMoved(data);
+            await refresh();
+        }
+
+        async function refresh() {
+            const data = await (await fetch(`/task/${taskId}/dependencies`)).json();
+            dependencySelect.value = data.dependency_id || '';
+
+            // tasks that already come after this one can't become its predecessor
+            const blocked = new Set(data.descendants.map(String));
+            [dependencySelect, addSelect].forEach(s => s.querySelectorAll('option').forEach(o => {
+                o.disabled = blocked.has(o.value);
+            }));
+
+            list.innerHTML = '';
+            data.predecessors.forEach(p => {
+                const row = document.createElement('div');
+                row.className = 'input-group input-group-sm mt-1';
+                row.innerHTML = `
+                    <span class="input-group-text text-truncate" style="max-width:10em">${escapeHtml(taskName(p.id))}</span>
+                    <input type="number" min="0" class="form-control" style="max-width:4.5em"
+                           title="Lag in business days" value="${p.lag_days}">
+                    <button type="button" class="btn btn-outline-danger" title="Remove">&times;</button>`;
+                row.querySelector('input').addEventListener('change', e => {
+                    setLink(p.id, parseInt(e.target.value, 10) || 0);
+                });
+                row.querySelector('button').addEventListener('click', async () => {
+                    await send('DELETE', `/task/${taskId}/dependencies/${p.id}`);
+                    await refresh();
+                });
+                list.append(row);
+            });
+        }
+
+        addBtn.addEventListener('click', async () => {
+            if (!addSelect.value) return;
+            await setLink(addSelect.value, parseInt(addLag.value, 10) || 0);
+            addSelect.value = '';
+            addLag.value = 0;
+        });
+
+        refresh();
+        return box;
+    }
+
+    document.querySelectorAll('.task-edit').forEach(btn => {
+        btn.addEventListener('click', async e => {
+            const tdBtn = e.target.closest('td');
+            const tr = tdBtn.parentElement;
+            const cells = tr.children;   // [Name, Category, Vendor, StartDate, EndDate, Follows, Status, Buttons]
+            const taskId = tdBtn.dataset.id;
+
+            const isEdit = btn.textContent === 'Edit';
+
+            if (isEdit) {
+                // --- switch to input mode ----------------
+                // Name
+                const iconEl = cells[0].querySelector('.note-icon');
+                const currentName = iconEl
+                      ? iconEl.previousSibling.textContent.trim()   // text before icon
+                      : cells[0].textContent.trim();
+                const currentNotes = iconEl ? iconEl.dataset.notes : '';
+
+                // stash notes so we can restore after Save
+                tdBtn.dataset.notes = currentNotes;
+
+                const nameInput = document.createElement('input');
+                nameInput.type = 'text';
+                nameInput.className = 'form-control form-control-sm';
+                nameInput.value = currentName;
+                cells[0].innerHTML = '';
+                cells[0].append(nameInput);
+
+                // Category
+                const curCat = cells[1].textContent.trim();
+                cells[1].innerHTML = '';
+                cells[1].append(makeSelect(categories, curCat));
+
+                // Vendor
+                const vendorInput = document.createElement('input');
+                vendorInput.type = 'text';
+                vendorInput.className = 'form-control form-control-sm';
+                vendorInput.value = cells[2].textContent.trim();
+                cells[2].innerHTML = '';
+                cells[2].append(vendorInput);
+
+                // Start date
+                const startDateInput = document.createElement('input');
+                startDateInput.type = 'date';
+                startDateInput.className = 'form-control form-control-sm';
+                const curStartDate = cells[3].textContent.trim();
+                if (curStartDate && curStartDate !== 'No Start Date') startDateInput.value = curStartDate;
+                cells[3].innerHTML = '';
+                cells[3].append(startDateInput);
+
+                // End date
+                const endDateInput = document.createElement('input');
+                endDateInput.type = 'date';
+                endDateInput.className = 'form-control form-control-sm';
+                const curEndDate = cells[4].textContent.trim();
+                if (curEndDate && curEndDate !== 'No End Date') endDateInput.value = curEndDate;
+                cells[4].innerHTML = '';
+                cells[4].append(endDateInput);
+
+                // Dependency
+                const curDependency = cells[5].querySelector('.badge:not(.extra-dependency)');
+                const currentDependencyId = curDependency ? curDependency.dataset.dependencyId : null;
+                cells[5].innerHTML = '';
+                const dependencySelect = makeDependencySelect(PAGE.tasks, currentDependencyId, taskId);
+                dependencySelect.classList.add('primary-dependency');
+                dependencySelect.title = 'Primary predecessor';
+                cells[5].append(dependencySelect, makePredecessorEditor(taskId, dependencySelect, moved => {
+                    // adding a predecessor can move this task and everything after it
+                    startDateInput.value = moved.start_date || '';
+                    endDateInput.value = moved.end_date || '';
+                    applyDependentUpdates(moved.dependent_tasks_updated);
+                }));
+
+                // Status
+                const curStatus = cells[6].textContent.trim();
+                cells[6].innerHTML = '';
+                cells[6].append(makeSelect(statuses, curStatus));
+
+                btn.textContent = 'Save';
+                btn.classList.remove('btn-outline-secondary');
+                btn.classList.add('btn-primary');
+            } else {
+                // --- gather values & save ----------------
+                const payload = {
+                    name: cells[0].querySelector('input').value.trim(),
+                    category: cells[1].querySelector('select').value,
+                    vendor: cells[2].querySelector('input').value.trim(),
+                    start_date: cells[3].querySelector('input').value || null,
+                    end_date: cells[4].querySelector('input').value || null,
+                    dependency_id: cells[5].querySelector('select.primary-dependency').value || null,
+                    status: cells[6].querySelector('select').value
+                };
+
+                const res = await fetch(`/task/${taskId}`, {
+                    method: 'PATCH',
+                    headers: {'Content-Type': 'application/json'},
+                    body: JSON.stringify(payload)
+                });
+
+                if (res.ok) {
+                    const responseData = await res.json();
+
+                    // swap back to display mode
+                    const notesVal = tdBtn.dataset.notes || '';
+                    cells[0].innerHTML = `
+                        ${payload.name}
+                        <span class="ms-1 text-muted note-icon"
+                              role="button"
+                              data-id="${taskId}"
+                              data-notes="${notesVal}">📝</span>`;
+                    cells[1].textContent = payload.category;
+                    cells[2].textContent = payload.vendor;
+                    cells[3].textContent = payload.start_date || 'No Start Date';
+                    cells[4].textContent = payload.end_date || 'No End Date';
+
+                    // Dependency display
+                    const deps = await (await fetch(`/task/${taskId}/dependencies`)).json();
+                    cells[5].innerHTML = dependencyBadges(deps.dependency_id, deps.predecessors);
+
+                    const badgeClass =
+                        payload.status === 'Complete'    ? 'bg-success'  :
+                        payload.status === 'In Progress' ? 'bg-warning'  :
+                                                           'bg-secondary';
+                    cells[6].innerHTML = `<span class="badge ${badgeClass}">${payload.status}</span>`;
+
+                    // strike row if status is Complete
+                    tr.classList.toggle('strike', payload.status === 'Complete');
+
+                    // Update the tasks_json array with the new data
+                    const taskIndex = PAGE.tasks.findIndex(t => t.id == taskId);
+                    if (taskIndex !== -1) {
+                        PAGE.tasks[taskIndex] = {
+                            ...PAGE.tasks[taskIndex],
+                            name: payload.name,
+                            start_date: payload.start_date,
+                            end_date: payload.end_date,
+                            dependency_id: deps.dependency_id
+                        };
+                    }
+
+                    // Check if this task has dependent tasks that were moved
+                    // and update their display in the table
+                    applyDependentUpdates(responseData.dependent_tasks_updated);
+
+                    btn.textContent = 'Edit';
+                    btn.classList.remove('btn-primary');
+                    btn.classList.add('btn-outline-secondary');
+                } else {
+                    const errorData = await res.json();
+                    alert('Error saving task: ' + (errorData.error || 'Unknown error'));
+                }
+            }
+        });
+    });
+})();
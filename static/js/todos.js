@@ -0,0 +1,59 @@
+(() => {
+    const projId = PAGE.projectId;
+    const listEl = document.getElementById('todo-list');
+    const inputEl = document.getElementById('todo-input');
+    const addBtn = document.getElementById('todo-add');
+
+    // helper to inject a LI element
+    function appendTodo(td) {
+        const li = document.createElement('li');
+        li.className = 'list-group-item d-flex align-items-center';
+        li.dataset.id = td.id;
+        li.innerHTML = `
+           <input class="form-check-input me-2 todo-check" type="checkbox">
+           <span class="flex-grow-1">${td.text}</span>
+           <button class="btn btn-sm btn-outline-danger todo-del">&times;</button>`;
+        listEl.append(li);
+    }
+
+    // Add
+    async function addTodo() {
+        const text = inputEl.value.trim();
+        if (!text) return;
+        const r = await fetch(`/project/${projId}/todo`, {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({text})
+        });
+        if (r.ok) {
+            appendTodo(await r.json());
+            inputEl.value = '';
+            inputEl.focus();
+        }
+    }
+    addBtn.onclick = addTodo;
+    inputEl.addEventListener('keypress', e => { if (e.key === 'Enter') addTodo(); });
+
+    // Delegate toggle / delete
+    listEl.addEventListener('click', async e => {
+        const li = e.target.closest('li');
+        if (!li) return;
+        const id = li.dataset.id;
+
+        // Toggle completed
+        if (e.target.classList.contains('todo-check')) {
+            const res = await fetch(`/todo/${id}/toggle`, {method: 'PATCH'});
+            if (res.ok) {
+                const {completed} = await res.json();
+                const span = li.querySelector('span');
+                span.classList.toggle('text-decoration-line-through', completed);
+                span.classList.toggle('text-muted', completed);
+            }
+        }
+        // Delete
+        if (e.target.classList.contains('todo-del')) {
+            const res = await fetch(`/todo/${id}`, {method: 'DELETE'});
+            if (res.ok) li.remove();
+        }
+    });
+})();
@@ -6,7 +6,10 @@ path = os.path.dirname(os.path.abspath(__file__))
 if path not in sys.path:
     sys.path.append(path)
 
-from app import app
+from app import app, init_db
+
+# Bring an older tracker.db up to the current schema (safe to run every start)
+init_db()
 
 if __name__ == "__main__":
     app.run()